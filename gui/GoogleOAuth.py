@@ -5,10 +5,6 @@ import logging
 import base64
 from email.mime.text import MIMEText
 import pickle
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 import mimetypes
 from email.mime.multipart import MIMEMultipart
 from email.mime.multipart import MIMEMultipart
@@ -19,6 +15,23 @@ from email import encoders
 # Configure logging
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# The Google client libraries are slow to import, so each is loaded the first time it is needed
+def load_credentials(token_path, scopes):
+    from google.oauth2.credentials import Credentials
+    return Credentials.from_authorized_user_file(token_path, scopes)
+
+def start_oauth_flow(client_secrets_path, scopes):
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    return InstalledAppFlow.from_client_secrets_file(client_secrets_path, scopes)
+
+def auth_request():
+    from google.auth.transport.requests import Request
+    return Request()
+
+def build(service_name, version, **kwargs):
+    from googleapiclient.discovery import build
+    return build(service_name, version, **kwargs)
+
 # Define the scope
 SCOPES = [
     'openid',
@@ -35,15 +48,15 @@ def connect_to_google_account():
 
     try:
         if os.path.exists(token_path):
-            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+            creds = load_credentials(token_path, SCOPES)
             if creds and creds.valid:
                 logging.info("Google account already connected.")
                 return "Google account already connected.", True
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
+                creds.refresh(auth_request())
             else:
-                flow = InstalledAppFlow.from_client_secrets_file(creds_path, SCOPES)
+                flow = start_oauth_flow(creds_path, SCOPES)
                 creds = flow.run_local_server(port=0)
             with open(token_path, 'w') as token:
                 token.write(creds.to_json())
@@ -61,9 +74,9 @@ def get_calendar_service():
             creds = pickle.load(token)
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+            creds.refresh(auth_request())
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
+            flow = start_oauth_flow(
                 'credentials.json', SCOPES)
             creds = flow.run_local_server(port=0)
         with open('token.pickle', 'wb') as token:
@@ -158,7 +171,7 @@ def delete_event(event_id):
 
 def get_gmail_service():
     try:
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+        creds = load_credentials('token.json', SCOPES)
         service = build('gmail', 'v1', credentials=creds)
         logging.info("Gmail service built successfully.")
         return service
@@ -322,17 +335,17 @@ def get_google_credentials():
     # Load existing credentials
     if os.path.exists(token_path):
         logging.debug(f"Loading existing credentials from {token_path}")
-        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+        creds = load_credentials(token_path, SCOPES)
     
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         logging.debug("No valid credentials found")
         if creds and creds.expired and creds.refresh_token:
             logging.debug("Refreshing expired credentials")
-            creds.refresh(Request())
+            creds.refresh(auth_request())
         else:
             logging.debug(f"Starting OAuth flow using {credentials_path}")
-            flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
+            flow = start_oauth_flow(credentials_path, SCOPES)
             creds = flow.run_local_server(port=0)
         
         # Save the credentials for the next run
@@ -1,18 +1,189 @@
-import soundfile as sf
-import sounddevice as sd
+import os
 import sys
+import json
+import time
 import logging
+import threading
 from retrying import retry
 from PyQt6.QtCore import QObject, pyqtSignal
 
 # Function imports from other modules
 sys.path.append('../server')
-from utils import get_news_updates
-from tts_thread import TextToSpeechThread
+from news_feed import get_new_articles, fetch_unseen, take_new, seen_articles, format_articles
+from tts_thread import speak, split_sentences, warm_up
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Articles read out per announcement, and the characters kept of each
+MAX_ARTICLES = 3
+MAX_ARTICLE_LENGTH = 500
+
+# Topics kept ready by the prefetcher
+SUBSCRIPTIONS_FILE = "news_subscriptions.json"
+
+# Seconds between background refreshes of a subscribed topic
+NEWS_REFRESH_INTERVAL = int(os.getenv("NEWS_REFRESH_INTERVAL", 15 * 60))
+
+# Also synthesize the announcement audio into the TTS cache in the background; it uses the shared TTS Space
+NEWS_PREFETCH_AUDIO = os.getenv("NEWS_PREFETCH_AUDIO", "0") == "1"
+
+# Milliseconds after startup before the first refresh, so it does not compete with the pet appearing
+NEWS_PREFETCH_START_DELAY = 30 * 1000
+
+# Seconds between refreshing one topic and the next
+REFRESH_SPACING = 2
+
+def format_announcement(articles):
+    return "\n\n".join(format_articles(articles, max_length=MAX_ARTICLE_LENGTH))
+
+def describe_age(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 60:
+        return f"{minutes} min ago"
+    return f"{minutes // 60} h {minutes % 60} min ago"
+
+class NewsPrefetcher:
+    """
+    Keeps the next announcement of each subscribed topic ready.
+
+    A daemon thread refreshes the subscribed topics every refresh_interval
+    seconds, one at a time with a pause in between, and optionally
+    synthesizes the audio of each sentence into the TTS cache too. Nothing is
+    marked as seen until an announcement takes it, so prefetching never hides
+    news from a live fetch.
+    """
+
+    def __init__(self, path=SUBSCRIPTIONS_FILE, refresh_interval=NEWS_REFRESH_INTERVAL, prefetch_audio=NEWS_PREFETCH_AUDIO):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.prefetch_audio = prefetch_audio
+        self._topics = self.load_subscriptions()
+        self._ready = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+
+    def load_subscriptions(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return list(json.load(f))
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logging.error(f"Error loading news subscriptions: {e}")
+            return []
+
+    def save_subscriptions(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._topics, f)
+        except OSError as e:
+            logging.error(f"Error saving news subscriptions: {e}")
+
+    def subscriptions(self):
+        with self._lock:
+            return list(self._topics)
+
+    def is_subscribed(self, topic):
+        with self._lock:
+            return topic in self._topics
+
+    def subscribe(self, topic):
+        with self._lock:
+            if topic in self._topics:
+                return
+            self._topics.append(topic)
+            self.save_subscriptions()
+        logging.info(f"Subscribed to news on {topic}.")
+        self.start()
+
+    def unsubscribe(self, topic):
+        with self._lock:
+            if topic not in self._topics:
+                return
+            self._topics.remove(topic)
+            self._ready.pop(topic, None)
+            self.save_subscriptions()
+        logging.info(f"Unsubscribed from news on {topic}.")
+
+    def start(self):
+        """Starts the background refresher, if there is anything to refresh."""
+        with self._lock:
+            if not self._topics:
+                return
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="news-prefetch", daemon=True)
+                self._worker.start()
+        self._wake.set()
+
+    def take(self, topic):
+        """
+        Returns the prepared announcement for a topic and marks its articles as seen.
+
+        Args:
+            topic (str): The news topic.
+
+        Returns:
+            dict: "articles", "text" (None if there is no new news) and "fetched_at", or None if nothing is prepared.
+        """
+        with self._lock:
+            entry = self._ready.pop(topic, None)
+        if entry is None:
+            return None
+        # Refill this topic for the next announcement
+        self._wake.set()
+
+        articles = take_new(topic, entry["articles"], MAX_ARTICLES)
+        if len(articles) == len(entry["articles"]):
+            return entry
+        # Some articles were announced since the refresh, so the prepared text no longer matches
+        text = format_announcement(articles) if articles else None
+        return {"articles": articles, "text": text, "fetched_at": entry["fetched_at"]}
+
+    def status(self):
+        """Returns the age in seconds of the prepared announcement of every subscribed topic (None if not ready)."""
+        now = time.time()
+        with self._lock:
+            return {topic: (now - self._ready[topic]["fetched_at"] if topic in self._ready else None) for topic in self._topics}
+
+    def refresh(self, topic):
+        articles = fetch_unseen(topic, MAX_ARTICLES)
+        if articles is None:
+            logging.warning(f"Could not prefetch news on {topic}.")
+            return
+        articles = seen_articles.filter_new(topic, articles)[:MAX_ARTICLES]
+        text = format_announcement(articles) if articles else None
+        if text and self.prefetch_audio:
+            # Cache the same chunks speak() will ask for
+            warm_up(split_sentences(text), wait=True)
+        with self._lock:
+            if topic in self._topics:
+                self._ready[topic] = {"articles": articles, "text": text, "fetched_at": time.time()}
+        logging.info(f"Prefetched {len(articles)} articles on {topic}.")
+
+    def _run(self):
+        while True:
+            now = time.time()
+            with self._lock:
+                stale = [topic for topic in self._topics
+                         if topic not in self._ready or now - self._ready[topic]["fetched_at"] >= self.refresh_interval]
+            for topic in stale:
+                self.refresh(topic)
+                time.sleep(REFRESH_SPACING)
+            self._wake.wait(timeout=self.refresh_interval)
+            self._wake.clear()
+
+_news_prefetcher = None
+
+def get_news_prefetcher():
+    global _news_prefetcher
+    if _news_prefetcher is None:
+        _news_prefetcher = NewsPrefetcher()
+    return _news_prefetcher
+
 class NewsAnnouncer(QObject):
     announcement_complete = pyqtSignal(str)
     news_text_ready = pyqtSignal(str)  # Add this signal
@@ -20,23 +191,35 @@ class NewsAnnouncer(QObject):
     def __init__(self, topic="technology"):
         super().__init__()
         self.topic = topic
-        self.tts_thread = None
+        self.fetched_at = None
 
     @retry(stop_max_attempt_number=3, wait_fixed=2000)
     def fetch_news(self):
+        # A subscribed topic is usually ready, so there is nothing to wait for
+        prepared = get_news_prefetcher().take(self.topic)
+        if prepared is not None:
+            logging.info(f"Using news on {self.topic} prefetched {describe_age(time.time() - prepared['fetched_at'])}.")
+            self.fetched_at = prepared["fetched_at"]
+            return prepared["text"] or f"No new news on {self.topic} since the last update."
+
         logging.info(f"Fetching news updates for topic: {self.topic}")
-        news_updates = get_news_updates(self.topic)
-        if not news_updates:
+        # Only the articles that will be read out are downloaded, and ones announced before are skipped
+        articles = get_new_articles(self.topic, MAX_ARTICLES)
+        if articles is None:
             logging.error("Unable to retrieve news updates.")
             raise Exception("Unable to retrieve news updates.")
+        self.fetched_at = time.time()
+        if not articles:
+            logging.info("No new articles since the last announcement.")
+            return f"No new news on {self.topic} since the last update."
+
+        news_updates = format_announcement(articles)
+        logging.info(f"Fetched {len(articles)} new articles.")
+        return news_updates
 
-        # Limit the number of articles or length of text
-        max_articles = 3  # Limit to 3 articles
-        max_length = 500  # Limit to 500 characters
-        truncated_updates = "\n\n".join([article[:max_length] for article in news_updates.split('\n\n')[:max_articles]])
-        
-        logging.info("News updates fetched and truncated successfully.")
-        return truncated_updates
+    def with_freshness(self, news_updates):
+        """Prefixes the news text with how long ago it was fetched."""
+        return f"(updated {describe_age(time.time() - self.fetched_at)})\n{news_updates}"
 
     def announce_news(self):
         logging.info("Starting the news announcement process.")
@@ -44,32 +227,24 @@ class NewsAnnouncer(QObject):
             news_updates = self.fetch_news()
         except Exception as e:
             logging.error(f"Failed to fetch news updates after multiple attempts: {e}")
+            self.announcement_complete.emit("Unable to retrieve news updates.")
             return
 
         logging.info(f"News updates: {news_updates}")
 
         # Emit the news text ready signal
-        self.news_text_ready.emit(news_updates)
+        self.news_text_ready.emit(self.with_freshness(news_updates))
 
-        # Use TTS to announce news updates
-        self.tts_thread = TextToSpeechThread(news_updates)
-        self.tts_thread.audio_ready.connect(self.play_audio)
-        self.tts_thread.error_occurred.connect(self.handle_error)
-        self.tts_thread.start()
-        logging.info("TTS process started.")
-
-    def play_audio(self, audio_path, text):
+        # Speak article by article; the first starts playing while the rest are still synthesized,
+        # and chunks the prefetcher already synthesized come from the TTS cache
         try:
-            logging.info("Playing audio for the news updates.")
-            # Play the audio
-            data, samplerate = sf.read(audio_path)
-            logging.info(f"Audio data read successfully from {audio_path}.")
-            sd.play(data, samplerate)
-            sd.wait()
-            logging.info("Audio playback finished.")
-            self.announcement_complete.emit("Announcement complete.")
+            time_to_first_audio = speak(news_updates)
         except Exception as e:
-            logging.error(f"Error playing audio: {e}")
+            self.handle_error(f"Error in TTS: {e}")
+            return
+        if time_to_first_audio is not None:
+            logging.info(f"News audio started after {time_to_first_audio:.2f}s.")
+        self.announcement_complete.emit("Announcement complete.")
 
     def handle_error(self, error_message):
         logging.error(f"Error in TTS process: {error_message}")
@@ -0,0 +1,151 @@
+import io
+import time
+import queue
+import logging
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+
+class PlaybackItem:
+    """One queued sound. done is set once it has played, failed or been dropped."""
+
+    def __init__(self, audio_path, label, generation):
+        self.audio_path = audio_path
+        self.label = label
+        self.generation = generation
+        self.played = False
+        self.started_at = None  # time.perf_counter() when playback began
+        self.error = None
+        self.done = threading.Event()
+
+class AudioPlayer(QObject):
+    """
+    Plays queued audio files one after another on its own thread.
+
+    Callers only enqueue and return at once, so no caller ever waits on the
+    sound card. Each file is read fully into memory and decoded before it
+    plays. interrupt() stops the current sound and drops everything queued
+    before it. Each enqueue carries the generation it was made for, so a
+    reply that is still synthesizing cannot add chunks after it has been
+    interrupted. The signals are emitted from the playback thread and reach
+    GUI slots through Qt's queued connections.
+    """
+
+    playback_started = pyqtSignal(str)  # Label of the sound that started
+    playback_finished = pyqtSignal(str)  # Label of the sound that finished or was stopped
+    queue_empty = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.generation = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._current = None
+
+    def enqueue(self, audio_path, label="", generation=None):
+        """
+        Queues a file for playback and returns immediately.
+
+        Args:
+            audio_path (str): The audio file.
+            label (str, optional): Passed to the playback signals, e.g. the text being spoken. Defaults to "".
+            generation (int, optional): The generation from begin(); the file is dropped if it is stale. Defaults to the current one.
+
+        Returns:
+            PlaybackItem: Its done event is set once the file has played or been dropped.
+        """
+        with self._lock:
+            item = PlaybackItem(audio_path, label, self.generation if generation is None else generation)
+            if item.generation != self.generation:
+                item.done.set()
+                return item
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="audio-player", daemon=True)
+                self._worker.start()
+        self._queue.put(item)
+        return item
+
+    def begin(self, interrupt=False):
+        """
+        Returns the generation to enqueue a new utterance under, optionally interrupting what is playing.
+        """
+        if interrupt:
+            return self.interrupt()
+        with self._lock:
+            return self.generation
+
+    def is_current(self, generation):
+        with self._lock:
+            return generation == self.generation
+
+    def interrupt(self):
+        """
+        Stops the current sound and drops everything queued.
+
+        Returns:
+            int: The new generation.
+        """
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            current = self._current
+        while True:
+            try:
+                self._queue.get_nowait().done.set()
+            except queue.Empty:
+                break
+        if current is not None:
+            import sounddevice as sd
+            sd.stop()
+        return generation
+
+    def _decode(self, audio_path):
+        import soundfile as sf
+        with open(audio_path, "rb") as f:
+            raw = f.read()
+        return sf.read(io.BytesIO(raw), dtype="float32")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if not self.is_current(item.generation):
+                    continue
+                try:
+                    import sounddevice as sd
+                    data, samplerate = self._decode(item.audio_path)
+                    with self._lock:
+                        # interrupt() may have run while the file was decoded
+                        if item.generation != self.generation:
+                            continue
+                        self._current = item
+                        sd.play(data, samplerate)
+                        item.started_at = time.perf_counter()
+                    self.playback_started.emit(item.label)
+                    # Returns early when interrupt() calls sd.stop()
+                    sd.wait()
+                    item.played = self.is_current(item.generation)
+                    self.playback_finished.emit(item.label)
+                except Exception as e:
+                    item.error = e
+                    logging.error(f"Error playing audio: {e}")
+                    self.error_occurred.emit(f"Error playing audio: {e}")
+                finally:
+                    with self._lock:
+                        self._current = None
+            finally:
+                item.done.set()
+                if self._queue.empty():
+                    self.queue_empty.emit()
+
+_audio_player = None
+_audio_player_lock = threading.Lock()
+
+# One player for the whole app, so replies and announcements never talk over each other
+def get_audio_player():
+    global _audio_player
+    with _audio_player_lock:
+        if _audio_player is None:
+            _audio_player = AudioPlayer()
+        return _audio_player
@@ -6,8 +6,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QDate, QTimer, QDateTime, QThread, pyqtSignal
 from PyQt6.QtGui import QFont
 from GoogleOAuth import get_upcoming_events, add_event, edit_event, delete_event
-from assistant import get_completion, create_assistant, create_thread
-from utils import get_current_location, get_weather, get_news_updates
+from assistant import get_completion
+from assistant_session import get_assistant_session
+from tools import tool_registry
 import datetime
 import pytz
 from plyer import notification
@@ -17,10 +18,10 @@ import re
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 
 # Registering the functions
-funcs = [get_current_location, get_weather, get_news_updates]
+funcs = tool_registry
 
-assistant_id = create_assistant(name="Holo", instructions="You are a helpful assistant.", model="gpt-4o")
-thread_id = create_thread(debug=True)
+# Shared by every feature; the assistant and thread are only created when first needed
+assistant_session = get_assistant_session()
 
 class LoadingScreen(QDialog):
     def __init__(self, parent=None, message="Loading..."):
@@ -424,7 +425,7 @@ class CalendarWidget(QWidget):
 
         # Get AI suggestion
         suggestion_prompt = f"Please provide a brief suggestion or tip for the event: {event_description.splitlines()[0]}"
-        suggestion = get_completion(assistant_id, thread_id, suggestion_prompt, funcs, debug=True)
+        suggestion = get_completion(assistant_session.assistant_id, assistant_session.thread_id, suggestion_prompt, funcs, debug=True, priority="normal")
 
         suggestion_label = QLabel(f"<b>AI Suggestion:</b> {suggestion}")
         suggestion_label.setWordWrap(True)
@@ -691,7 +692,7 @@ class CalendarWidget(QWidget):
             "end": "yyyy-MM-ddTHH:mm:ssZ"
         }}
         """
-        available_slot = get_completion(assistant_id, thread_id, prompt, funcs, debug=True)
+        available_slot = get_completion(assistant_session.assistant_id, assistant_session.thread_id, prompt, funcs, debug=True, priority="normal")
 
         loading_screen.hide()
 
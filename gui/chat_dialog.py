@@ -1,27 +1,25 @@
 import sys
-import speech_recognition as sr
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QPushButton, QMessageBox, QHBoxLayout, QCheckBox, QInputDialog, QLabel
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QPushButton, QMessageBox, QHBoxLayout, QCheckBox, QInputDialog, QLabel, QListWidget
 from PyQt6.QtCore import pyqtSignal, QThread, Qt
-import soundfile as sf
-import sounddevice as sd
 import logging
 
 sys.path.append('../server')
-from assistant import get_completion
-from utils import get_current_location, get_weather, get_news_updates
-from announce_news import NewsAnnouncer
-from tts_thread import TextToSpeechThread
+from tools import tool_registry
+from conversation_store import get_conversation_store
+from tts_thread import SpeechThread
+from audio_player import get_audio_player
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-funcs = [get_current_location, get_weather, get_news_updates]
+funcs = tool_registry
 
 class SpeechToTextThread(QThread):
     recognized_text = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
 
     def run(self):
+        import speech_recognition as sr
         recognizer = sr.Recognizer()
         microphone = sr.Microphone()
 
@@ -43,6 +41,7 @@ class NewsAnnouncementThread(QThread):
         super().__init__()
         self.topic = topic
         self.use_audio = use_audio
+        from announce_news import NewsAnnouncer
         self.news_announcer = NewsAnnouncer(topic)
         self.news_announcer.announcement_complete.connect(self.announcement_complete.emit)
         self.news_announcer.news_text_ready.connect(self.news_text_ready.emit)
@@ -51,17 +50,110 @@ class NewsAnnouncementThread(QThread):
         if self.use_audio:
             self.news_announcer.announce_news()
         else:
-            news_text = self.news_announcer.fetch_news()
-            self.news_text_ready.emit(news_text)
+            try:
+                news_text = self.news_announcer.fetch_news()
+            except Exception as e:
+                logging.error(f"Failed to fetch news updates: {e}")
+                self.announcement_complete.emit("Unable to retrieve news updates.")
+                return
+            self.news_text_ready.emit(self.news_announcer.with_freshness(news_text))
             self.announcement_complete.emit("Announcement complete.")
 
+class ChatThread(QThread):
+    response_received = pyqtSignal(object)  # The reply text, or {"image": path} for a generated image
+    partial_response = pyqtSignal(str)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, assistant_session, user_input):
+        super().__init__()
+        self.assistant_session = assistant_session
+        self.user_input = user_input
+        self.partial_text = ""
+
+    def run(self):
+        try:
+            from assistant import get_completion
+            response = get_completion(self.assistant_session.assistant_id, self.assistant_session.thread_id, self.user_input, funcs, debug=True, on_delta=self.handle_delta, priority="interactive")
+            self.response_received.emit(response)
+        except Exception as e:
+            logging.error(f"Error getting a reply: {e}")
+            self.error_occurred.emit(f"Error getting a reply: {e}")
+
+    def handle_delta(self, delta):
+        self.partial_text += delta
+        self.partial_response.emit(self.partial_text)
+
+class HistoryDialog(QDialog):
+    """Shows the current conversation from the local store, with search across all conversations."""
+
+    def __init__(self, assistant_session, parent=None):
+        super().__init__(parent)
+        self.store = get_conversation_store()
+        self.thread_id = assistant_session.loaded_thread_id
+        if self.thread_id is None:
+            # Nothing sent yet in this session: show the most recent stored conversation
+            threads = self.store.list_threads(limit=1)
+            self.thread_id = threads[0]["thread_id"] if threads else None
+        self.before = None
+
+        self.setWindowTitle("Chat History")
+        self.setGeometry(150, 150, 500, 400)
+        layout = QVBoxLayout()
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText("Search all conversations")
+        self.search_input.returnPressed.connect(self.search)
+        search_layout.addWidget(self.search_input)
+        search_button = QPushButton("Search", self)
+        search_button.clicked.connect(self.search)
+        search_layout.addWidget(search_button)
+        layout.addLayout(search_layout)
+
+        self.message_list = QListWidget(self)
+        self.message_list.setWordWrap(True)
+        layout.addWidget(self.message_list)
+
+        self.load_older_button = QPushButton("Load older messages", self)
+        self.load_older_button.clicked.connect(self.load_older)
+        layout.addWidget(self.load_older_button)
+
+        self.setLayout(layout)
+        self.show_thread()
+
+    def show_thread(self):
+        self.message_list.clear()
+        self.before = None
+        self.load_older()
+
+    def load_older(self):
+        if self.thread_id is None:
+            self.load_older_button.setEnabled(False)
+            return
+        page = self.store.get_messages(self.thread_id, before=self.before)
+        for row, message in enumerate(page["messages"]):
+            self.message_list.insertItem(row, f"{message['role'].capitalize()}: {message['content']}")
+        self.before = page["before"]
+        self.load_older_button.setEnabled(self.before is not None)
+
+    def search(self):
+        query = self.search_input.text().strip()
+        if not query:
+            self.show_thread()
+            return
+        self.message_list.clear()
+        self.load_older_button.setEnabled(False)
+        for message in self.store.search(query):
+            self.message_list.addItem(f"{message['role'].capitalize()}: {message['snippet']}")
+        if self.message_list.count() == 0:
+            self.message_list.addItem("No messages found.")
+
 class ChatDialog(QDialog):
     response_received = pyqtSignal(str)
 
-    def __init__(self, assistant_id, thread_id):
+    def __init__(self, assistant_session):
         super().__init__()
-        self.assistant_id = assistant_id
-        self.thread_id = thread_id
+        self.assistant_session = assistant_session
 
         self.setWindowTitle("Chat with Assistant")
         self.setGeometry(100, 100, 400, 300)
@@ -84,10 +176,31 @@ class ChatDialog(QDialog):
         self.announce_news_button.clicked.connect(self.announce_news)
         button_layout.addWidget(self.announce_news_button)
 
+        self.history_button = QPushButton("History", self)
+        self.history_button.clicked.connect(self.show_history)
+        button_layout.addWidget(self.history_button)
+
+        # Audio plays on the shared player's own thread; this only reflects and stops it
+        self.audio_player = get_audio_player()
+        self.stop_audio_button = QPushButton("Stop Audio", self)
+        self.stop_audio_button.setEnabled(False)
+        self.stop_audio_button.clicked.connect(self.audio_player.interrupt)
+        self.audio_player.playback_started.connect(lambda label: self.stop_audio_button.setEnabled(True))
+        self.audio_player.queue_empty.connect(lambda: self.stop_audio_button.setEnabled(False))
+        button_layout.addWidget(self.stop_audio_button)
+
         self.audio_checkbox = QCheckBox("Enable Audio", self)
         self.audio_checkbox.setChecked(True)
         button_layout.addWidget(self.audio_checkbox)
 
+        # Subscribed news topics are refreshed in the background, so announcing them starts at once.
+        # It shows whether the last announced topic is subscribed; clicking it changes the next topic announced.
+        self.subscribe_checkbox = QCheckBox("Keep topic ready", self)
+        self.subscribe_checkbox.setToolTip("Click to start or stop refreshing the next topic you announce in the background")
+        self.subscribe_choice = None
+        self.subscribe_checkbox.clicked.connect(self.set_subscribe_choice)
+        button_layout.addWidget(self.subscribe_checkbox)
+
         self.layout.addLayout(button_layout)
 
         # Add loading label
@@ -103,14 +216,36 @@ class ChatDialog(QDialog):
         if user_message:
             self.user_input.clear()
             self.response_received.emit(f"You: {user_message}")
-            assistant_response = get_completion(self.assistant_id, self.thread_id, user_message, funcs, debug=True)
-            if self.audio_checkbox.isChecked():
-                self.tts_thread = TextToSpeechThread(assistant_response)
-                self.tts_thread.audio_ready.connect(self.play_audio_and_display_bubble)
-                self.tts_thread.error_occurred.connect(self.handle_error)
-                self.tts_thread.start()
-            else:
-                self.response_received.emit(f"Assistant: {assistant_response}")
+            self.send_button.setEnabled(False)
+            self.chat_thread = ChatThread(self.assistant_session, user_message)
+            self.chat_thread.partial_response.connect(self.display_partial_response)
+            self.chat_thread.response_received.connect(self.handle_response)
+            self.chat_thread.error_occurred.connect(self.handle_chat_error)
+            self.chat_thread.start()
+
+    def display_partial_response(self, text):
+        self.response_received.emit(f"Assistant: {text}")
+
+    def handle_response(self, assistant_response):
+        self.send_button.setEnabled(True)
+        if isinstance(assistant_response, dict):
+            assistant_response = f"Image saved to {assistant_response['image']}"
+        self.response_received.emit(f"Assistant: {assistant_response}")
+        if self.audio_checkbox.isChecked():
+            # Speak sentence by sentence, so playback starts once the first sentence is synthesized;
+            # a new reply cuts off whatever is still being said
+            self.tts_thread = SpeechThread(assistant_response, interrupt=True)
+            self.tts_thread.first_audio.connect(lambda seconds: logging.info(f"Reply audio started after {seconds:.2f}s"))
+            self.tts_thread.error_occurred.connect(self.handle_error)
+            self.tts_thread.start()
+
+    def handle_chat_error(self, error_message):
+        self.send_button.setEnabled(True)
+        self.handle_error(error_message)
+
+    def show_history(self):
+        self.history_dialog = HistoryDialog(self.assistant_session, self)
+        self.history_dialog.show()
 
     def speech_to_text(self):
         self.speech_thread = SpeechToTextThread()
@@ -127,30 +262,33 @@ class ChatDialog(QDialog):
         self.response_received.emit(error_message)
         QMessageBox.warning(self, "Error", error_message)
 
-    def play_audio_and_display_bubble(self, audio_path, text):
-        try:
-            self.response_received.emit(f"Assistant: {text}")
-
-            data, samplerate = sf.read(audio_path)
-            sd.play(data, samplerate)
-            sd.wait()
-        except Exception as e:
-            self.handle_error(f"Error playing audio: {e}")
-
     def closeEvent(self, event):
         self.hide()
         event.ignore()
 
     def announce_news(self):
-        topic, ok = QInputDialog.getText(self, "News Topic", "Enter the topic for news updates:")
+        from announce_news import get_news_prefetcher
+        prefetcher = get_news_prefetcher()
+        topic, ok = QInputDialog.getItem(self, "News Topic", "Enter the topic for news updates:", prefetcher.subscriptions(), 0, True)
+        topic = topic.strip()
         if ok and topic:
             logging.info(f"Announcing news for topic: {topic}")
+            # Only an explicit click changes a subscription, so later topics are never subscribed by default
+            if self.subscribe_choice is True:
+                prefetcher.subscribe(topic)
+            elif self.subscribe_choice is False:
+                prefetcher.unsubscribe(topic)
+            self.subscribe_choice = None
+            self.subscribe_checkbox.setChecked(prefetcher.is_subscribed(topic))
             self.loading_label.show()
             self.news_thread = NewsAnnouncementThread(topic, self.audio_checkbox.isChecked())
             self.news_thread.announcement_complete.connect(self.display_announcement_status)
             self.news_thread.news_text_ready.connect(self.display_news_text)
             self.news_thread.start()
 
+    def set_subscribe_choice(self, checked):
+        self.subscribe_choice = checked
+
     def display_news_text(self, news_text):
         self.response_received.emit(f"News: {news_text}")
 
@@ -3,7 +3,8 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from GoogleOAuth import fetch_emails, send_email, quick_reply, get_email_details, delete_email
-from assistant import get_completion, create_assistant, create_thread
+from assistant import get_completion
+from assistant_session import get_assistant_session
 import os
 import logging
 
@@ -42,8 +43,7 @@ class EmailManager(QWidget):
         self.initUI()
         self.fetch_emails_thread = None
         self.loading_screen = None
-        self.assistant_id = create_assistant(name="Holo", instructions="You are a helpful assistant.", model="gpt-4o")
-        self.thread_id = create_thread(debug=True)
+        self.assistant_session = get_assistant_session()
         self.fetch_emails()
 
     def initUI(self):
@@ -210,7 +210,7 @@ class EmailManager(QWidget):
 
     def ai_suggest_reply(self, email_body, email_id, subject, recipient, parent_dialog):
         prompt = f"Provide a brief, professional reply to the following email:\n\n{email_body}"
-        suggestion = get_completion(self.assistant_id, self.thread_id, prompt, funcs=[])
+        suggestion = get_completion(self.assistant_session.assistant_id, self.assistant_session.thread_id, prompt, funcs=[], priority="normal")
         
         suggestion_dialog = QDialog(parent_dialog)
         suggestion_dialog.setWindowTitle("AI Suggestion")
@@ -9,69 +9,45 @@ import hashlib
 import logging
 from PyQt6.QtWidgets import QApplication, QWidget, QMenu, QSystemTrayIcon, QLabel, QMessageBox, QVBoxLayout, QInputDialog
 from PyQt6.QtGui import QIcon, QImage, QPixmap, QCursor
-from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
-from utils import get_current_location, get_weather, get_news_updates
+from PyQt6.QtCore import Qt, QTimer
+from tools import tool_registry
 
-from chat_dialog import ChatDialog
 from sticky_note_dialog import StickyNoteDialog
 from screen_time_tracker import ScreenTimeTracker
-from to_do_list import ToDoListDialog
-from assistant import create_assistant, create_thread, get_completion, analyze_file
+from assistant_session import get_assistant_session
 
 # from GoogleOAuth import GoogleOAuth
 from GoogleOAuth import connect_to_google_account, get_user_email, get_upcoming_events
-from calendar_widget import CalendarWidget
+from announce_news import get_news_prefetcher, NEWS_PREFETCH_START_DELAY
 
-from focus import FocusTimer
-
-from email_management import EmailManager
-
-from goal_setting import GoalSettingDialog
-
-from httplib2 import Credentials
-from googleapiclient.discovery import build
-
-from ocr_feedback import OCRThread
-
-from reminder import ReminderSettingsDialog
+# Feature dialogs (chat, calendar, email, goals, focus, OCR feedback, reminders)
+# are imported when first opened, so startup does not pay for their
+# dependencies: the OpenAI client, matplotlib, speech and audio libraries.
 
 # Registering the functions
-funcs = [get_current_location, get_weather, get_news_updates]
+funcs = tool_registry
 
-assistant_id = create_assistant(name="Holo", instructions="You are a helpful assistant.", model="gpt-4o")
-thread_id = create_thread(debug=True)
+# Shared by every feature; the assistant and thread are only created when first needed
+assistant_session = get_assistant_session()
 
 pets = []
 
-class ChatThread(QThread):
-    response_received = pyqtSignal(str)
-
-    def __init__(self, assistant_id, thread_id, user_input):
-        super().__init__()
-        self.assistant_id = assistant_id
-        self.thread_id = thread_id
-        self.user_input = user_input
-
-    def run(self):
-        response = get_completion(self.assistant_id, self.thread_id, self.user_input, funcs, debug=True)
-        self.response_received.emit(response)
-
-
 class myAssistant(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.initUI()
-        self.assistant_id = assistant_id
-        self.thread_id = thread_id
+        self.assistant_session = assistant_session
         self.screen_time_update_timer = QTimer()
         self.google_connected = False
         self.screen_time_displayed = False
         self.ocr_feedback_enabled = False 
         self.user_id = None
         self.ocr_feedback_timer = QTimer()
-        # Focus Mode
-        self.focus_timer = FocusTimer()
-        self.email_manager = EmailManager()  
+        # Keep subscribed news topics ready, once startup is over
+        QTimer.singleShot(NEWS_PREFETCH_START_DELAY, get_news_prefetcher().start)
+        # Focus Mode and Email Management are created when first shown
+        self.focus_timer = None
+        self.email_manager = None
         self.screen_time_tracker = ScreenTimeTracker()
         self.screen_time_tracker.screen_time_exceeded.connect(self.remind_to_rest)
         self.screen_time_tracker.screen_time_updated.connect(self.update_screen_time_label)
@@ -116,7 +92,7 @@ class myAssistant(QWidget):
 
         # self.to_do_list_dialog = ToDoListDialog()
 
-        self.calendar_widget = CalendarWidget() 
+        self.calendar_widget = None
 
     def getImgs(self, pics):
         listPic = []
@@ -259,6 +235,7 @@ class myAssistant(QWidget):
         logging.info("OCR feedback stopped.")
 
     def run_ocr_feedback(self):
+        from ocr_feedback import OCRThread
         self.ocr_thread = OCRThread()
         self.ocr_thread.feedback_received.connect(self.display_chat_bubble)
         self.ocr_thread.start()
@@ -283,6 +260,7 @@ class myAssistant(QWidget):
         if hasattr(self, 'goal_dialog') and self.goal_dialog.isVisible():
             self.goal_dialog.raise_()
         else:
+            from goal_setting import GoalSettingDialog
             self.goal_dialog = GoalSettingDialog(user_id)
             self.goal_dialog.show()
           
@@ -302,11 +280,13 @@ class myAssistant(QWidget):
                 QMessageBox.warning(self, "Error", "Failed to retrieve user email. Please Connect To Your Google Account.")
                 return
             self.user_id = self.generate_user_id(user_email)
-        self.to_do_list_dialog = ToDoListDialog(self.user_id, self.assistant_id, self.thread_id)
+        from to_do_list import ToDoListDialog
+        self.to_do_list_dialog = ToDoListDialog(self.user_id, self.assistant_session)
         self.to_do_list_dialog.show()
     
     def chatWithAssistant(self):
-        self.chat_dialog = ChatDialog(assistant_id, thread_id)
+        from chat_dialog import ChatDialog
+        self.chat_dialog = ChatDialog(self.assistant_session)
         self.chat_dialog.response_received.connect(self.display_chat_bubble)
         self.chat_dialog.show()
 
@@ -324,6 +304,7 @@ class myAssistant(QWidget):
     ## Screen Time Tracker
     def toggle_screen_time_reminder(self):
         if not self.screen_time_tracker.reminder_enabled:
+            from reminder import ReminderSettingsDialog
             dialog = ReminderSettingsDialog(self)
             if dialog.exec():
                 interval = dialog.interval_spinbox.value()
@@ -416,13 +397,22 @@ class myAssistant(QWidget):
         QMessageBox.information(self, "Upcoming Events", events)
     
     def show_calendar_widget(self):
+        if self.calendar_widget is None:
+            from calendar_widget import CalendarWidget
+            self.calendar_widget = CalendarWidget()
         self.calendar_widget.update_events()
         self.calendar_widget.show()
     
     def show_focus_timer(self):  # Method to show the Focus Timer
+        if self.focus_timer is None:
+            from focus import FocusTimer
+            self.focus_timer = FocusTimer()
         self.focus_timer.show()
 
     def show_email_management(self):
+        if self.email_manager is None:
+            from email_management import EmailManager
+            self.email_manager = EmailManager()
         self.email_manager.show()
     
     def generate_user_id(self, email):
@@ -5,22 +5,21 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPush
                              QListWidgetItem, QTabWidget, QCalendarWidget, QProgressBar)
 from PyQt6.QtCore import QDate, Qt
 from PyQt6.QtGui import QPixmap, QColor
-from fpdf import FPDF
-import matplotlib.pyplot as plt
 import webbrowser
 import sys
 import os
 import re
 sys.path.append('../server')
-from assistant import get_completion, create_assistant, create_thread
-from utils import get_current_location, get_weather, get_news_updates
+from assistant import get_completion
+from assistant_session import get_assistant_session
+from tools import tool_registry
 
 DATABASE = 'goals.db'
 
-funcs = [get_current_location, get_weather, get_news_updates]
+funcs = tool_registry
 
-assistant_id = create_assistant(name="Holo", instructions="You are a helpful assistant.", model="gpt-4o")
-thread_id = create_thread(debug=True)
+# Shared by every feature; the assistant and thread are only created when first needed
+assistant_session = get_assistant_session()
 
 def normalize_text(text):
     # Replace or remove unsupported characters
@@ -172,6 +171,8 @@ class GoalSetting:
             titles = [goal[1] for goal in goals]
             progress = [goal[10] for goal in goals]
 
+            # matplotlib takes about a second to import, so it is only loaded for reports
+            import matplotlib.pyplot as plt
             plt.figure(figsize=(10, 6))
             plt.barh(titles, progress, color='skyblue')
             plt.xlabel('Progress (%)')
@@ -218,6 +219,7 @@ class GoalSetting:
         goals = self.get_goals(user_id)
         
         # Create PDF
+        from fpdf import FPDF
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", size=12)
@@ -280,6 +282,7 @@ class GoalSetting:
             titles = [goal[1] for goal in goals]
             progress = [goal[10] for goal in goals]
             
+            import matplotlib.pyplot as plt
             plt.figure(figsize=(10, 6))
             plt.barh(titles, progress, color='skyblue')
             plt.xlabel('Progress (%)')
@@ -299,7 +302,7 @@ class GoalSetting:
         try:
             report_content = "\n".join([f"ID: {goal[0]}, Title: {goal[1]}, Description: {goal[2]}, Status: {goal[5]}, Progress: {goal[10]}%" for goal in goals])
             user_input = f"Analyze the following goal report and provide professional suggestions\n\n{report_content}"
-            suggestions = get_completion(assistant_id, thread_id, user_input, funcs, debug=True)
+            suggestions = get_completion(assistant_session.assistant_id, lambda: assistant_session.background_thread_id, user_input, funcs, debug=True, use_cache=True, priority="background")
         except Exception as e:
             suggestions = "AI analysis not available due to an error."
 
@@ -317,7 +320,7 @@ class GoalSetting:
         # Get AI-generated motivational quote
         try:
             quote_input = "Provide a motivational quote to inspire productivity and goal achievement."
-            motivational_quote = get_completion(assistant_id, thread_id, quote_input, funcs, debug=True)
+            motivational_quote = get_completion(assistant_session.assistant_id, lambda: assistant_session.background_thread_id, quote_input, funcs, debug=True, use_cache=True, priority="background")
         except Exception as e:
             motivational_quote = "Keep pushing forward and never give up on your dreams."
 
@@ -960,7 +963,7 @@ class GoalSettingDialog(QDialog):
 
             # Get AI analysis and suggestions
             try:
-                suggestions = get_completion(assistant_id, thread_id, user_input, funcs, debug=True)
+                suggestions = get_completion(assistant_session.assistant_id, lambda: assistant_session.background_thread_id, user_input, funcs, debug=True, use_cache=True, priority="background")
             except Exception as e:
                 QMessageBox.critical(self, "AI Analysis Error", f"An error occurred during AI analysis: {str(e)}")
                 return
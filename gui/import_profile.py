@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+# Per-module import times of the GUI and server entry points, and a cold-start
+# budget check. Every measurement runs in a fresh interpreter, so nothing is
+# already in sys.modules. Run it after adding an import to a module the pet
+# loads at startup:
+#
+#   python import_profile.py             # slowest modules behind each target
+#   python import_profile.py --budget    # exit 1 if a target is over budget
+
+GUI_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(GUI_DIR, "..", "server")
+
+# Module to import, the directory to import it from, and its cold-start budget in seconds.
+# functions is what main.py loads before the pet appears; the feature modules
+# below it are only imported when the user opens them.
+TARGETS = {
+    "functions": (GUI_DIR, 1.0),
+    "assistant_session": (SERVER_DIR, 0.3),
+    "utils": (SERVER_DIR, 0.5),
+    "tools": (SERVER_DIR, 0.5),
+}
+
+# Cold starts per target in --budget mode; the fastest is compared against the budget
+BUDGET_RUNS = 3
+
+def _environment():
+    env = dict(os.environ)
+    # Importing PyQt6 widgets must not need a display
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+def import_times(module, cwd):
+    """
+    Imports module in a fresh interpreter under -X importtime.
+
+    Args:
+        module (str): The module to import.
+        cwd (str): The directory to run the interpreter in.
+
+    Returns:
+        list: (module name, self seconds, cumulative seconds) for every module imported.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=cwd, env=_environment(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return times
+
+def cold_start(module, cwd):
+    """Returns the wall time in seconds of starting an interpreter and importing module."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", f"import {module}"],
+                            cwd=cwd, env=_environment(), capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    return elapsed
+
+def print_profile(module, cwd, top):
+    times = import_times(module, cwd)
+    total = next((cumulative for name, _, cumulative in times if name == module), 0)
+    print(f"\n== {module}: {total:.3f}s ==")
+    print(f"{'self':>8} {'cumulative':>11}  module")
+    for name, self_time, cumulative in sorted(times, key=lambda row: row[1], reverse=True)[:top]:
+        print(f"{self_time:7.3f}s {cumulative:10.3f}s  {name}")
+
+def check_budget(targets):
+    """
+    Measures the cold start of every target against its budget.
+
+    Returns:
+        bool: True if every target is within budget.
+    """
+    # Interpreter startup alone, so the budgets only cover the imports themselves
+    baseline = min(cold_start("sys", GUI_DIR) for _ in range(BUDGET_RUNS))
+    print(f"Interpreter startup: {baseline:.3f}s (subtracted below)")
+
+    ok = True
+    for module in targets:
+        cwd, budget = TARGETS[module]
+        try:
+            elapsed = min(cold_start(module, cwd) for _ in range(BUDGET_RUNS)) - baseline
+        except RuntimeError as e:
+            print(f"{module:<20} FAILED  {e}")
+            ok = False
+            continue
+        status = "OK" if elapsed <= budget else "OVER BUDGET"
+        ok = ok and elapsed <= budget
+        print(f"{module:<20} {elapsed:6.3f}s  budget {budget:.3f}s  {status}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-module import times and check the cold-start budget.")
+    parser.add_argument("targets", nargs="*", default=list(TARGETS), help=f"modules to measure (default: {' '.join(TARGETS)})")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list per target")
+    parser.add_argument("--budget", action="store_true", help="check cold start against the budgets and exit 1 if over")
+    args = parser.parse_args()
+
+    unknown = [module for module in args.targets if module not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets {unknown}, expected some of {list(TARGETS)}")
+
+    if args.budget:
+        return 0 if check_budget(args.targets) else 1
+
+    for module in args.targets:
+        cwd, _ = TARGETS[module]
+        print_profile(module, cwd, args.top)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
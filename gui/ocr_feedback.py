@@ -1,17 +1,18 @@
 import sys
-import pyautogui
 import logging
 from PyQt6.QtCore import QThread, pyqtSignal
 import base64
-from openai import OpenAI
 sys.path.append('../server')
-from assistant import analyze_image
 
 class OCRThread(QThread):
     feedback_received = pyqtSignal(str)
 
     def run(self):
         try:
+            # Both need a display and take a while to load, so they are imported on the first capture
+            import pyautogui
+            from assistant import analyze_image
+
             # Capture screen
             screenshot = pyautogui.screenshot()
             screenshot.save("screenshot.png")
@@ -23,7 +24,7 @@ class OCRThread(QThread):
                 logging.info("Image successfully encoded to base64.")
 
             # Analyze the image
-            response = analyze_image(encoded_image)
+            response = analyze_image(encoded_image, priority="background")
             logging.info(f"Image analysis response: {response}")
 
             # Emit feedback received
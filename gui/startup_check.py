@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+sys.path.append('../server')
+
+import assistant
+
+# Record every request the OpenAI client sends
+openai_requests = []
+assistant.client._client.event_hooks["request"].append(lambda request: openai_requests.append(f"{request.method} {request.url}"))
+
+def run_startup_check(create_widget=False):
+    """
+    Imports the GUI (and optionally builds the pet) and checks no OpenAI traffic happened.
+
+    Args:
+        create_widget (bool, optional): Whether to also construct the main widget. Defaults to False.
+
+    Returns:
+        bool: True if startup made no OpenAI requests.
+    """
+
+    start = time.perf_counter()
+    import functions
+    import_time = time.perf_counter() - start
+    print(f"Imported functions in {import_time:.2f}s")
+
+    if create_widget:
+        from PyQt6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv)
+        start = time.perf_counter()
+        functions.myAssistant()
+        print(f"Created the pet widget in {time.perf_counter() - start:.2f}s")
+
+    from assistant_session import get_assistant_session
+    session = get_assistant_session()
+
+    if openai_requests or session.is_initialized():
+        print("FAIL: OpenAI was contacted before any assistant feature was used:")
+        for request in openai_requests:
+            print(f"  {request}")
+        return False
+
+    print("OK: no OpenAI requests during startup.")
+    return True
+
+if __name__ == "__main__":
+    if "--widget" in sys.argv:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.exit(0 if run_startup_check("--widget" in sys.argv) else 1)
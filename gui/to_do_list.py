@@ -8,21 +8,20 @@ import database
 import logging
 from task_widget import TaskWidget
 from styles import style_sheet
-from assistant import get_completion, create_assistant, create_thread
+from assistant import get_completion
 import json
 
-assistant_id = create_assistant(name="Holo", instructions="You are a helpful assistant.", model="gpt-4o")
-thread_id = create_thread(debug=True)
-
 # Configure logging
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Seconds an auto-filled task is reused for the same topic; its due date must not fall in the past
+AUTO_FILL_CACHE_TTL = 10 * 60
+
 class ToDoListDialog(QDialog):
-    def __init__(self, user_id, assistant_id , thread_id):
+    def __init__(self, user_id, assistant_session):
         super().__init__()
         self.user_id = user_id  # Store the user_id
-        self.assistant_id = assistant_id  # Store the assistant_id
-        self.thread_id = thread_id  # Store the thread_id
+        self.assistant_session = assistant_session  # Shared assistant session, loaded on first use
         self.setWindowTitle("To-Do List")
         self.setGeometry(100, 100, 800, 600)
         self.setWindowIcon(QIcon('icons/todo.png'))
@@ -309,8 +308,9 @@ class ToDoListDialog(QDialog):
         topic, ok = QInputDialog.getText(self, 'Input Topic', 'Enter a suitable topic for the task:')
         
         if ok and topic:
+            today = QDateTime.currentDateTime().toString("yyyy-MM-dd")
             prompt = f"""
-            Generate suitable values for a task related to "{topic}" for university students. The output should be a JSON object with the following fields (The due date should not be earlier than the current date and time and must be logical) Examples:
+            Generate suitable values for a task related to "{topic}" for university students. Today is {today}. The output should be a JSON object with the following fields (The due date should not be earlier than the current date and time and must be logical) Examples:
             {{
                 "title": "Example Title",
                 "due_date": "2024-07-25 14:00",
@@ -320,7 +320,7 @@ class ToDoListDialog(QDialog):
             }}
             """
             print("Sending prompt to AI for auto-fill fields...")
-            response = get_completion(self.assistant_id, self.thread_id, prompt, funcs=[])
+            response = get_completion(self.assistant_session.assistant_id, lambda: self.assistant_session.thread_id, prompt, funcs=[], use_cache=True, cache_ttl=AUTO_FILL_CACHE_TTL, priority="normal")
 
             print(f"AI Response: {response}")
 
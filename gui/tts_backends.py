@@ -0,0 +1,403 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+
+# Backends to use, most preferred first; later ones take over when earlier ones fail or are slow
+TTS_BACKENDS = [name.strip() for name in os.getenv("TTS_BACKENDS", "gradio,local").split(",") if name.strip()]
+
+# API_URL = "https://xzjosh-azuma-bert-vits2-0-2.hf.space/--replicas/v0fs1/"
+# API_URL = "https://xzjosh-azuma-bert-vits2-0-2.hf.space/--replicas/lyypv/"
+API_URL = os.getenv("TTS_GRADIO_URL", "https://xzjosh-azuma-bert-vits2-2-3.hf.space/--replicas/ys8hc/")
+
+# Replicas of the Space to spread requests over, comma separated; defaults to API_URL alone
+TTS_GRADIO_URLS = [url.strip() for url in os.getenv("TTS_GRADIO_URLS", API_URL).split(",") if url.strip()]
+
+# Seconds a synthesis request may take before the replica is treated as down
+TTS_REQUEST_TIMEOUT = 60
+
+# Seconds between health checks of the replicas that are down or idle
+HEALTH_CHECK_INTERVAL = 60
+HEALTH_CHECK_TIMEOUT = 5
+
+# A request slower than TTS_MAX_LATENCY + TTS_MAX_SECONDS_PER_CHAR * characters counts as too slow
+TTS_MAX_LATENCY = float(os.getenv("TTS_MAX_LATENCY", 5))
+TTS_MAX_SECONDS_PER_CHAR = float(os.getenv("TTS_MAX_SECONDS_PER_CHAR", 0.05))
+
+# Seconds a failed or too slow backend is skipped before it is tried again
+TTS_BACKEND_COOLDOWN = 300
+
+# Weight of the newest request in a backend's average latency per character
+LATENCY_SMOOTHING = 0.3
+
+class TTSBackend:
+    """
+    A speech synthesizer. Subclasses implement synthesize().
+
+    name identifies the backend in settings and stats, and voice is
+    everything that changes how its audio sounds, so the audio cache keeps
+    each backend's files apart.
+    """
+
+    name = None
+    voice = None
+    # Whether synthesize() returns a temporary file the caller may move away
+    temporary_files = False
+
+    def available(self):
+        return True
+
+    def synthesize(self, text):
+        """Returns the path of an audio file speaking text."""
+        raise NotImplementedError
+
+class Replica:
+    """One Gradio Space URL, its client and how well it has been answering."""
+
+    def __init__(self, url):
+        self.url = url
+        self.client = None
+        self.healthy = True
+        self.latency = None  # Smoothed seconds per request
+        self.in_flight = 0
+        self.failures = 0
+        self.last_used = 0
+        self._connect_lock = threading.Lock()
+
+    def get_client(self):
+        # Connect on the first request; other requests to this replica wait for the same connection
+        if self.client is None:
+            with self._connect_lock:
+                if self.client is None:
+                    from gradio_client import Client
+                    print(f"Connecting to API at {self.url}")
+                    self.client = Client(self.url, verbose=False)
+                    print("Connected successfully.")
+        return self.client
+
+    def score(self):
+        # Expected wait: its latency, times the requests it already has; unmeasured replicas go first
+        return (self.latency or 0) * (1 + self.in_flight)
+
+class GradioClientPool:
+    """
+    Clients for several replicas of the Space, connected lazily and checked in the background.
+
+    Each request goes to the healthy replica with the lowest expected wait:
+    its smoothed latency times its requests in flight. A Gradio client runs
+    its jobs on its own worker threads, so concurrent requests to one replica
+    do not queue behind each other on our side. A replica whose request fails
+    or times out is marked down and its client dropped. A daemon thread
+    probes it every HEALTH_CHECK_INTERVAL seconds and reconnects it once it
+    answers again.
+    """
+
+    def __init__(self, urls=TTS_GRADIO_URLS, request_timeout=TTS_REQUEST_TIMEOUT, check_interval=HEALTH_CHECK_INTERVAL):
+        self.replicas = [Replica(url) for url in urls]
+        self.request_timeout = request_timeout
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checker = None
+
+    def _ranked(self):
+        with self._lock:
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            # With every replica down, still try them rather than fail without a request
+            return sorted(healthy or self.replicas, key=lambda replica: replica.score())
+
+    def _start_checker(self):
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._check_loop, name="tts-health-check", daemon=True)
+                self._checker.start()
+
+    def predict(self, *args, **kwargs):
+        """
+        Runs one prediction on the best replica, trying the others in turn if it fails.
+
+        Returns:
+            The prediction result.
+        """
+        self._start_checker()
+        errors = []
+        for replica in self._ranked():
+            with self._lock:
+                replica.in_flight += 1
+            start = time.perf_counter()
+            try:
+                result = replica.get_client().submit(*args, **kwargs).result(timeout=self.request_timeout)
+            except Exception as e:
+                self._mark_down(replica, e)
+                errors.append(f"{replica.url}: {e}")
+                continue
+            finally:
+                with self._lock:
+                    replica.in_flight -= 1
+            self._record(replica, time.perf_counter() - start)
+            return result
+        raise RuntimeError(f"No TTS replica answered: {'; '.join(errors)}")
+
+    def _record(self, replica, elapsed):
+        with self._lock:
+            replica.latency = elapsed if replica.latency is None else replica.latency + LATENCY_SMOOTHING * (elapsed - replica.latency)
+            replica.healthy = True
+            replica.last_used = time.monotonic()
+
+    def _mark_down(self, replica, error):
+        logging.warning(f"TTS replica {replica.url} failed: {error}")
+        with self._lock:
+            replica.healthy = False
+            replica.failures += 1
+            replica.client = None
+
+    def check(self, replica):
+        """
+        Probes a replica's config endpoint, and reconnects it if it was down.
+
+        Returns:
+            bool: Whether the replica answered.
+        """
+        import httpx
+        start = time.perf_counter()
+        try:
+            response = httpx.get(replica.url.rstrip("/") + "/config", timeout=HEALTH_CHECK_TIMEOUT)
+            response.raise_for_status()
+        except Exception as e:
+            with self._lock:
+                replica.healthy = False
+            logging.info(f"TTS replica {replica.url} is down: {e}")
+            return False
+        elapsed = time.perf_counter() - start
+        if replica.client is None:
+            try:
+                replica.get_client()
+            except Exception as e:
+                logging.info(f"TTS replica {replica.url} could not reconnect: {e}")
+                return False
+        with self._lock:
+            if not replica.healthy:
+                logging.info(f"TTS replica {replica.url} is back.")
+            replica.healthy = True
+            # A probe is cheaper than a synthesis, so it only seeds a replica that has no measurement yet
+            if replica.latency is None:
+                replica.latency = elapsed
+        return True
+
+    def _check_loop(self):
+        while True:
+            time.sleep(self.check_interval)
+            now = time.monotonic()
+            for replica in self.replicas:
+                # Busy healthy replicas prove themselves with every request
+                if not replica.healthy or now - replica.last_used > self.check_interval:
+                    self.check(replica)
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    "url": replica.url,
+                    "healthy": replica.healthy,
+                    "connected": replica.client is not None,
+                    "latency": replica.latency,
+                    "in_flight": replica.in_flight,
+                    "failures": replica.failures,
+                }
+                for replica in self.replicas
+            ]
+
+class GradioBackend(TTSBackend):
+    """The Bert-VITS2 Hugging Face Space, through a pool of its replicas."""
+
+    name = "gradio"
+
+    # Everything after the text that /tts_split is called with
+    VOICE_PARAMS = (
+        "东雪莲",  # voice type
+        0.2,  # SDP/DP slider value
+        0.5,  # float (numeric value between 0.1 and 2)
+        0.9,  # 音素长度 slider value
+        1.0,  # 语速 slider value
+        "EN",  # Language type
+        False,  # bool
+        0.2,  # float (numeric value between 0 and 10)
+        1,  # float (numeric value between 0 and 5) in
+    )
+    voice = VOICE_PARAMS
+
+    def __init__(self, urls=TTS_GRADIO_URLS):
+        self.pool = GradioClientPool(urls)
+
+    def synthesize(self, text):
+        result = self.pool.predict(
+            text,  # input text
+            *self.VOICE_PARAMS,
+            api_name="/tts_split"
+        )
+        return result[1]  # The audio file path
+
+class LocalBackend(TTSBackend):
+    """
+    An offline engine: pyttsx3 (the system voice: SAPI5, NSSpeechSynthesizer
+    or espeak) if it is installed, otherwise the espeak-ng or espeak command.
+    """
+
+    name = "local"
+    temporary_files = True
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._engine = None
+        self._command = shutil.which("espeak-ng") or shutil.which("espeak")
+        # pyttsx3 engines are not thread-safe
+        self._lock = threading.Lock()
+        self.voice = ["local", rate]
+
+    def _pyttsx3(self):
+        if self._engine is None:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+            if self.rate:
+                self._engine.setProperty("rate", self.rate)
+        return self._engine
+
+    def available(self):
+        try:
+            import pyttsx3  # noqa: F401
+            return True
+        except ImportError:
+            return self._command is not None
+
+    def synthesize(self, text):
+        fd, audio_path = tempfile.mkstemp(prefix="holo-tts-", suffix=".wav")
+        os.close(fd)
+        try:
+            with self._lock:
+                try:
+                    engine = self._pyttsx3()
+                except ImportError:
+                    engine = None
+                if engine is not None:
+                    engine.save_to_file(text, audio_path)
+                    engine.runAndWait()
+                elif self._command:
+                    command = [self._command, "-w", audio_path]
+                    if self.rate:
+                        command += ["-s", str(self.rate)]
+                    subprocess.run(command + [text], check=True, capture_output=True)
+                else:
+                    raise RuntimeError("No local TTS engine: install pyttsx3 or espeak-ng")
+            if os.path.getsize(audio_path) == 0:
+                raise RuntimeError("The local TTS engine produced no audio")
+        except Exception:
+            os.remove(audio_path)
+            raise
+        return audio_path
+
+# Backend name -> class, for TTS_BACKENDS
+BACKENDS = {
+    GradioBackend.name: GradioBackend,
+    LocalBackend.name: LocalBackend,
+}
+
+class FallbackBackend:
+    """
+    Tries the backends in order of preference and falls back on failure or slowness.
+
+    A backend that raises, or takes longer than max_latency plus
+    max_seconds_per_char per character, is skipped for cooldown seconds. The
+    audio of a slow request is still used. When every backend is cooling
+    down, all of them are tried again in order rather than giving up.
+    """
+
+    def __init__(self, backends, max_latency=TTS_MAX_LATENCY, max_seconds_per_char=TTS_MAX_SECONDS_PER_CHAR, cooldown=TTS_BACKEND_COOLDOWN):
+        self.backends = backends
+        self.max_latency = max_latency
+        self.max_seconds_per_char = max_seconds_per_char
+        self.cooldown = cooldown
+        self._skip_until = {backend.name: 0 for backend in backends}
+        self._seconds_per_char = {}
+        self._failures = {backend.name: 0 for backend in backends}
+        self._served = {backend.name: 0 for backend in backends}
+        self._lock = threading.Lock()
+
+    def _candidates(self):
+        now = time.monotonic()
+        with self._lock:
+            ready = [backend for backend in self.backends if self._skip_until[backend.name] <= now]
+        return ready or list(self.backends)
+
+    def _demote(self, backend, reason):
+        logging.warning(f"TTS backend {backend.name} {reason}; using the next one for {self.cooldown}s.")
+        with self._lock:
+            self._skip_until[backend.name] = time.monotonic() + self.cooldown
+
+    def synthesize(self, text):
+        """
+        Synthesizes text with the first backend that works.
+
+        Returns:
+            tuple: The audio file path and the backend that produced it.
+        """
+        errors = []
+        for backend in self._candidates():
+            start = time.perf_counter()
+            try:
+                audio_path = backend.synthesize(text)
+            except Exception as e:
+                with self._lock:
+                    self._failures[backend.name] += 1
+                self._demote(backend, f"failed ({e})")
+                errors.append(f"{backend.name}: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._served[backend.name] += 1
+                per_char = elapsed / max(len(text), 1)
+                previous = self._seconds_per_char.get(backend.name, per_char)
+                self._seconds_per_char[backend.name] = previous + LATENCY_SMOOTHING * (per_char - previous)
+            if elapsed > self.max_latency + self.max_seconds_per_char * len(text):
+                self._demote(backend, f"took {elapsed:.1f}s for {len(text)} characters")
+            return audio_path, backend
+        raise RuntimeError(f"No TTS backend could synthesize the text: {'; '.join(errors)}")
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                backend.name: {
+                    "served": self._served[backend.name],
+                    "failures": self._failures[backend.name],
+                    "seconds_per_char": self._seconds_per_char.get(backend.name),
+                    "skipped_for": round(max(0, self._skip_until[backend.name] - now), 1),
+                }
+                for backend in self.backends
+            }
+
+def create_backends(names=TTS_BACKENDS):
+    """Builds the configured backends that can run on this machine, in order."""
+    backends = []
+    for name in names:
+        if name not in BACKENDS:
+            logging.error(f"Unknown TTS backend '{name}', expected one of {list(BACKENDS)}")
+            continue
+        backend = BACKENDS[name]()
+        if backend.available():
+            backends.append(backend)
+        else:
+            logging.info(f"TTS backend {name} is not available on this machine.")
+    return backends
+
+_tts_backend = None
+_tts_backend_lock = threading.Lock()
+
+def get_tts_backend():
+    global _tts_backend
+    with _tts_backend_lock:
+        if _tts_backend is None:
+            _tts_backend = FallbackBackend(create_backends())
+        return _tts_backend
@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import argparse
+
+import tts_thread
+from tts_thread import split_sentences, synthesize_chunks
+from tts_backends import BACKENDS, get_tts_backend
+
+# Time to first audio of a long reply, synthesized whole versus sentence by
+# sentence. By default it calls the configured TTS backend directly, bypassing
+# the audio cache; --simulate uses a latency model instead (a fixed cost per
+# request plus a cost per character) to compare settings without network access.
+#
+# --backends compares the synthesis latency per character of every TTS
+# backend that can run on this machine, bypassing the audio cache.
+
+SAMPLE_TEXT = (
+    "Here is your technology news for this morning. "
+    "A new open-source language model was released today, and early benchmarks suggest it matches much larger systems. "
+    "Researchers say the model runs comfortably on a single consumer graphics card. "
+    "In hardware news, a major chip maker announced a laptop processor with a dedicated neural engine. "
+    "Battery life is said to improve by up to thirty percent compared with last year's models. "
+    "Finally, several cities are piloting autonomous delivery robots on their sidewalks this month. "
+    "Residents are encouraged to share feedback through the city's website."
+)
+
+def simulated_synthesize(request_seconds, char_seconds):
+    def synthesize(text):
+        time.sleep(request_seconds + char_seconds * len(text))
+        return text
+    return synthesize
+
+def uncached_synthesize(text):
+    # The audio cache would turn every round after the first into a hit
+    audio_path, backend = get_tts_backend().synthesize(text)
+    if backend.temporary_files:
+        os.remove(audio_path)
+    return audio_path
+
+def measure(text, synthesize, workers, chunk_chars, play_seconds_per_char):
+    """
+    Returns (time to first audio, time until all audio was played) for one pipelined run.
+
+    Playback is simulated by sleeping for the duration of each chunk, so later
+    chunks render while earlier ones are "playing".
+    """
+    start = time.perf_counter()
+    first = None
+    for chunk, _ in synthesize_chunks(split_sentences(text, chunk_chars), synthesize=synthesize, workers=workers):
+        if first is None:
+            first = time.perf_counter() - start
+        time.sleep(play_seconds_per_char * len(chunk))
+    return first, time.perf_counter() - start
+
+def compare_backends(names, rounds):
+    """
+    Prints each backend's fixed cost per request and cost per character.
+
+    Both come from a least-squares line through the fastest of rounds
+    requests at each of three text lengths.
+    """
+    texts = [SAMPLE_TEXT[:length].rsplit(" ", 1)[0] + "." for length in (40, 160, 480)]
+    print(f"{'backend':<10} {'per request':>12} {'per char':>10}  fastest at {', '.join(str(len(text)) for text in texts)} chars")
+    for name in names:
+        backend = BACKENDS[name]()
+        if not backend.available():
+            print(f"{name:<10} not available on this machine")
+            continue
+        fastest = []
+        try:
+            for text in texts:
+                times = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    audio_path = backend.synthesize(text)
+                    times.append(time.perf_counter() - start)
+                    if backend.temporary_files:
+                        os.remove(audio_path)
+                fastest.append(min(times))
+        except Exception as e:
+            print(f"{name:<10} failed: {e}")
+            continue
+        lengths = [len(text) for text in texts]
+        mean_length = sum(lengths) / len(lengths)
+        mean_time = sum(fastest) / len(fastest)
+        per_char = (sum((length - mean_length) * (seconds - mean_time) for length, seconds in zip(lengths, fastest))
+                    / sum((length - mean_length) ** 2 for length in lengths))
+        per_request = mean_time - per_char * mean_length
+        print(f"{name:<10} {per_request:11.3f}s {per_char * 1000:8.2f}ms  {', '.join(f'{seconds:.2f}s' for seconds in fastest)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure TTS time to first audio, whole text versus sentence chunks.")
+    parser.add_argument("--rounds", type=int, default=3, help="runs per measurement")
+    parser.add_argument("--workers", type=int, default=tts_thread.TTS_WORKERS, help="chunks synthesized at once")
+    parser.add_argument("--chunk-chars", type=int, default=tts_thread.TTS_CHUNK_CHARS, help="longest chunk in characters")
+    parser.add_argument("--simulate", action="store_true", help="use a latency model instead of the TTS backend")
+    parser.add_argument("--request-seconds", type=float, default=1.0, help="simulated cost per request")
+    parser.add_argument("--char-seconds", type=float, default=0.01, help="simulated cost per character")
+    parser.add_argument("--play-seconds-per-char", type=float, default=0.06, help="speaking rate used to simulate playback")
+    parser.add_argument("--backends", nargs="*", choices=list(BACKENDS), help="compare the latency per character of these backends (default: all)")
+    args = parser.parse_args()
+
+    if args.backends is not None:
+        compare_backends(args.backends or list(BACKENDS), args.rounds)
+        return 0
+
+    synthesize = simulated_synthesize(args.request_seconds, args.char_seconds) if args.simulate else uncached_synthesize
+    chunks = split_sentences(SAMPLE_TEXT, args.chunk_chars)
+    print(f"{len(SAMPLE_TEXT)} characters in {len(chunks)} chunks, {args.workers} workers"
+          f"{' (simulated)' if args.simulate else ''}")
+
+    # Whole text: nothing plays until the single request returns
+    whole = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        synthesize(SAMPLE_TEXT)
+        whole.append(time.perf_counter() - start)
+
+    pipelined = [measure(SAMPLE_TEXT, synthesize, args.workers, args.chunk_chars, args.play_seconds_per_char)
+                 for _ in range(args.rounds)]
+
+    play_time = args.play_seconds_per_char * len(SAMPLE_TEXT)
+    print(f"{'whole text':<12} first audio {min(whole):6.2f}s  finished {min(whole) + play_time:6.2f}s")
+    print(f"{'pipelined':<12} first audio {min(first for first, _ in pipelined):6.2f}s  "
+          f"finished {min(total for _, total in pipelined):6.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
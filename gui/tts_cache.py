@@ -0,0 +1,176 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+
+# Directory holding the cached audio files, relative to the working directory
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+
+# Total size of the cached audio; the least recently played files are removed beyond it
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+class AudioCache:
+    """
+    Synthesized audio files on disk, named by a hash of the text and voice settings.
+
+    A file's modification time records when it was last used, so the least
+    recently used files are removed first once the directory grows past
+    max_bytes. The sizes are read from disk once at start, so a restarted
+    app keeps its cache.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._sizes = {}
+        self._names = {}  # key -> file name, which keeps the extension of the synthesized audio
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if os.path.isfile(path) and not name.endswith(".tmp"):
+                self._add(name, os.path.getsize(path))
+
+    @staticmethod
+    def make_key(text, voice):
+        """Hashes the text and everything that changes how it sounds into a cache key."""
+        payload = json.dumps([text, voice], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _find(self, key):
+        # Caller holds the lock
+        return self._names.get(key)
+
+    def _add(self, name, size):
+        # Caller holds the lock
+        self._sizes[name] = size
+        self._names[name.split(".", 1)[0]] = name
+
+    def _remove(self, name):
+        # Caller holds the lock
+        self._names.pop(name.split(".", 1)[0], None)
+        return self._sizes.pop(name)
+
+    def contains(self, key):
+        """Returns whether key is cached, without counting a hit or miss."""
+        with self._lock:
+            return self._find(key) is not None
+
+    def get(self, key):
+        """
+        Returns the path of the cached audio for key, or None on a miss.
+        """
+        with self._lock:
+            name = self._find(key)
+            if name is None:
+                self.misses += 1
+                return None
+            path = os.path.join(self.cache_dir, name)
+            try:
+                # Mark it as recently used
+                os.utime(path)
+            except OSError:
+                # Removed behind our back
+                self._remove(name)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return path
+
+    def put(self, key, audio_path, move=False):
+        """
+        Copies a synthesized file into the cache.
+
+        Args:
+            key (str): The key from make_key.
+            audio_path (str): The synthesized file, e.g. in the Gradio client's temporary directory.
+            move (bool, optional): Move the file instead of copying it, for temporary files. Defaults to False.
+
+        Returns:
+            str: The path of the cached copy, or audio_path itself if it could not be cached.
+        """
+        extension = os.path.splitext(audio_path)[1]
+        name = key + extension
+        path = os.path.join(self.cache_dir, name)
+        try:
+            # Copy under a temporary name so a reader never sees half a file
+            if move:
+                shutil.move(audio_path, path + ".tmp")
+            else:
+                shutil.copyfile(audio_path, path + ".tmp")
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logging.error(f"Error caching TTS audio: {e}")
+            return audio_path
+        with self._lock:
+            previous = self._find(key)
+            if previous is not None and previous != name:
+                # The same text was cached before in another format
+                try:
+                    os.remove(os.path.join(self.cache_dir, previous))
+                except OSError:
+                    pass
+                self._remove(previous)
+            self._add(name, os.path.getsize(path))
+            self._evict(keep=name)
+        return path
+
+    def _evict(self, keep):
+        # Caller holds the lock
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_last_use = sorted(self._sizes, key=lambda name: self._last_used(name))
+        for name in by_last_use:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= self._remove(name)
+
+    def _last_used(self, name):
+        try:
+            return os.path.getmtime(os.path.join(self.cache_dir, name))
+        except OSError:
+            return 0
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._sizes):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+            self._sizes.clear()
+            self._names.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._sizes),
+                "bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+# Created on first use, so the cache directory only appears once something is spoken
+def get_audio_cache():
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = AudioCache()
+        return _audio_cache
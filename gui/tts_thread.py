@@ -1,46 +1,186 @@
-import sys
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PyQt6.QtCore import QThread, pyqtSignal
-from gradio_client import Client
-import soundfile as sf
-import sounddevice as sd
-
-# API_URL = "https://xzjosh-azuma-bert-vits2-0-2.hf.space/--replicas/v0fs1/"
-# API_URL = "https://xzjosh-azuma-bert-vits2-0-2.hf.space/--replicas/lyypv/"
-API_URL = "https://xzjosh-azuma-bert-vits2-2-3.hf.space/--replicas/ys8hc/"
-# Initialize the Gradio client
-try:
-    print(f"Connecting to API at {API_URL}")
-    client = Client(API_URL)
-    print("Connected successfully.")
-except ValueError as e:
-    print(f"Error connecting to API: {e}")
-    sys.exit(1)
-
-
-class TextToSpeechThread(QThread):
+from tts_cache import get_audio_cache
+from tts_backends import get_tts_backend
+from audio_player import get_audio_player
+
+# Longest chunk sent to the Space in one request; shorter sentences are merged up to it
+TTS_CHUNK_CHARS = 200
+
+# Chunks synthesized at the same time
+TTS_WORKERS = 3
+
+# Return the cached audio of text from any configured backend, most preferred first, or None
+def cached_audio(text):
+    cache = get_audio_cache()
+    for backend in get_tts_backend().backends:
+        audio_path = cache.get(cache.make_key(text, backend.voice))
+        if audio_path is not None:
+            return audio_path
+    return None
+
+def is_cached(text):
+    cache = get_audio_cache()
+    return any(cache.contains(cache.make_key(text, backend.voice)) for backend in get_tts_backend().backends)
+
+# Synthesize text and return the path of the audio file; repeated text is served from the audio cache
+def synthesize(text):
+    audio_path = cached_audio(text)
+    if audio_path is not None:
+        return audio_path
+    audio_path, backend = get_tts_backend().synthesize(text)
+    cache = get_audio_cache()
+    return cache.put(cache.make_key(text, backend.voice), audio_path, move=backend.temporary_files)
+
+def warm_up(phrases, wait=False):
+    """
+    Synthesizes phrases that are not cached yet, one at a time, so speaking them later needs no request.
+
+    Args:
+        phrases (list): The texts to cache, e.g. fixed reminder messages or the chunks of a prepared announcement.
+        wait (bool, optional): Synthesize on the calling thread instead of a daemon thread. Defaults to False.
+
+    Returns:
+        int: The number of phrases that had to be synthesized, or None when not waiting.
+    """
+    def run():
+        synthesized = 0
+        for phrase in dict.fromkeys(phrases):
+            if is_cached(phrase):
+                continue
+            try:
+                synthesize(phrase)
+                synthesized += 1
+            except Exception as e:
+                logging.warning(f"Could not warm up TTS for {phrase!r}: {e}")
+        return synthesized
+
+    if wait:
+        return run()
+    threading.Thread(target=run, name="tts-warm-up", daemon=True).start()
+    return None
+
+
+# Split text into sentence chunks of at most max_chars, merging short sentences
+def split_sentences(text, max_chars=TTS_CHUNK_CHARS):
+    sentences = [sentence for sentence in re.split(r"(?<=[.!?。！？])\s+|\n+", text.strip()) if sentence.strip()]
+    chunks = []
+    current = ""
+    for sentence in sentences:
+        # A sentence longer than a chunk is cut at the last space before the limit
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def synthesize_chunks(chunks, synthesize=synthesize, workers=TTS_WORKERS):
+    """
+    Synthesizes chunks concurrently and yields (chunk, audio_path) in the original order.
+
+    At most workers chunks are rendered at once. Each chunk is yielded as soon
+    as it and every chunk before it are done, so playback of the first can
+    start while the rest are still rendering. Closing the generator early
+    cancels the chunks that have not started.
+
+    Args:
+        chunks (list): The text chunks, e.g. from split_sentences.
+        synthesize (callable, optional): Turns a chunk into an audio file path. Defaults to the Gradio Space.
+        workers (int, optional): The number of chunks rendered at once. Defaults to TTS_WORKERS.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))), thread_name_prefix="tts")
+    try:
+        futures = [executor.submit(synthesize, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            yield chunk, future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Play an audio file on the shared player; with wait, block the calling worker thread until it has played
+def play_audio_file(audio_path, wait=True):
+    item = get_audio_player().enqueue(audio_path)
+    if wait:
+        item.done.wait()
+        if item.error:
+            raise item.error
+    return item
+
+def speak(text, on_chunk=None, interrupt=False, wait=True):
+    """
+    Synthesizes text sentence by sentence and queues it on the shared player, starting with the first chunk that is ready.
+
+    Synthesis stops early if the player is interrupted in the meantime.
+
+    Args:
+        text (str): The text to speak.
+        on_chunk (callable, optional): Called with each chunk's text as it is queued for playback.
+        interrupt (bool, optional): Stop whatever is playing or queued first, e.g. for a new reply. Defaults to False.
+        wait (bool, optional): Return only once the last chunk has played. Defaults to True.
+
+    Returns:
+        float: With wait, the seconds until the first audio started playing, or None if nothing played.
+    """
+    player = get_audio_player()
+    generation = player.begin(interrupt)
+    start = time.perf_counter()
+    items = []
+    chunks = synthesize_chunks(split_sentences(text))
+    try:
+        for chunk, audio_path in chunks:
+            if not player.is_current(generation):
+                break
+            if on_chunk:
+                on_chunk(chunk)
+            items.append(player.enqueue(audio_path, chunk, generation))
+    finally:
+        # Cancels the chunks not synthesized yet if we stopped early
+        chunks.close()
+
+    if not wait or not items:
+        return None
+    items[-1].done.wait()
+    errors = [item.error for item in items if item.error]
+    if errors:
+        raise errors[0]
+    return items[0].started_at - start if items[0].started_at else None
+
+
+class SpeechThread(QThread):
+    """
+    Speaks text with the sentence-chunked pipeline, so long replies start playing after the first sentence.
+
+    With interrupt, whatever is already playing stops first.
+    """
+
+    chunk_queued = pyqtSignal(str)
+    first_audio = pyqtSignal(float)  # Seconds until the first chunk started playing
+    finished_speaking = pyqtSignal()
     error_occurred = pyqtSignal(str)
-    audio_ready = pyqtSignal(str, str)  # Include text in the signal
 
-    def __init__(self, text):
+    def __init__(self, text, interrupt=False):
         super().__init__()
         self.text = text
+        self.interrupt = interrupt
 
     def run(self):
         try:
-            result = client.predict(
-                self.text,  # input text
-                "东雪莲",  # voice type
-                0.2,  # SDP/DP slider value
-                0.5,  # float (numeric value between 0.1 and 2) 
-                0.9,  # 音素长度 slider value
-                1.0,  # 语速 slider value
-                "EN",  # Language type
-                False,  # bool 
-                0.2,  # float (numeric value between 0 and 10) 
-                1,  # float (numeric value between 0 and 5) in 
-                api_name="/tts_split"
-            )
-            audio_path = result[1]  # The audio file path
-            self.audio_ready.emit(audio_path, self.text)  # Emit the signal with the audio path and text
+            time_to_first_audio = speak(self.text, self.chunk_queued.emit, interrupt=self.interrupt)
+            if time_to_first_audio is not None:
+                self.first_audio.emit(time_to_first_audio)
+            self.finished_speaking.emit()
         except Exception as e:
             self.error_occurred.emit(f"Error in TTS: {e}")
@@ -3,10 +3,18 @@ import os
 import re
 import json
 import time
-from openai import OpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from openai import OpenAI, DefaultHttpxClient
 from dotenv import load_dotenv
-import requests
-from utils import get_current_location, get_weather, get_news_updates 
+import http_client
+from tools import ToolError, as_registry
+from run_queue import run_queue
+from response_cache import RESPONSE_CACHE_TTL, get_response_cache
+from metrics import RUNS, TOOL_CALLS, ERRORS, phase_timer, observe_phase, count_errors
+from rate_limiter import scheduler, prioritized, event_hooks, estimate_chat_tokens
+from thread_pool import WarmThreadPool
+from conversation_store import get_conversation_store
 import logging
 
 # Registering the functions
@@ -18,8 +26,28 @@ load_dotenv()
 # Load OpenAI API key
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Create OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY, timeout=600)
+# Create OpenAI client; every request it sends waits its turn in the shared rate limiter
+client = OpenAI(api_key=OPENAI_API_KEY, timeout=600, http_client=DefaultHttpxClient(event_hooks=event_hooks()))
+
+# Unused threads kept ready, so a new conversation does not wait for threads.create
+thread_pool = WarmThreadPool(
+    create=lambda: client.beta.threads.create().id,
+    delete=lambda thread_id: client.beta.threads.delete(thread_id),
+)
+
+# Bounded pool shared by all tool calls, so a burst of calls cannot spawn unbounded threads
+MAX_TOOL_WORKERS = 8
+tool_executor = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="tool")
+tool_executor_lock = threading.Lock()
+
+# A run normally creates a single reply message, so a handful is always enough
+RUN_MESSAGES_LIMIT = 5
+
+# Times a direct API call is retried after a 429, each after the rate limiter's backoff
+RATE_LIMIT_RETRIES = 3
+
+# Seconds a tool may run before its output is replaced with an error, unless it registers its own timeout
+DEFAULT_TOOL_TIMEOUT = 15
 
 # Load or create a new assistant
 def create_assistant(
@@ -61,6 +89,16 @@ def create_assistant(
                     if debug:
                         print(f"Assistant '{name}' already exists with ID: {assistant_id}")
 
+                    # The tool registry may have changed since the assistant was created
+                    if tools is not None and assistant_data.get("tools") != tools:
+                        try:
+                            client.beta.assistants.update(assistant_id, tools=tools)
+                            assistant_data["tools"] = tools
+                            _save_assistant_json(assistant_file_path, assistant_json)
+                            print("Updated tools of assistant with ID:", assistant_id)
+                        except Exception as e:
+                            print(f"Error updating assistant tools: {e}")
+
                     return assistant_id
                 
     # Upload files to get file IDs
@@ -96,212 +134,457 @@ def create_assistant(
     assistant_json.append(
         {
             "assistant_name": assistant_name,
-            "assistant_id": assistant_id
+            "assistant_id": assistant_id,
+            "tools": tools
         }
     )
 
+    _save_assistant_json(assistant_file_path, assistant_json)
+    print("Assistant data saved to:", assistant_file_path)
+
+    return assistant_id
+
+# Save the list of known assistants
+def _save_assistant_json(assistant_file_path, assistant_json):
     with open(assistant_file_path, "w", encoding="utf-8") as file:
         json.dump(assistant_json, file, ensure_ascii=False, indent=4)
-        print("Assistant data saved to:", assistant_file_path)
-        
-    return assistant_id
 
 # Create thread
 def create_thread(debug=False):
     """
-    Creates a new thread.
+    Creates a new thread, taking a pre-created one from the warm pool when one is ready.
 
     Returns:
         str: The ID of the created thread.
     """
 
-    thread = client.beta.threads.create()
-
-    thread_id = thread.id
+    thread_id = thread_pool.get()
 
     if debug:
         print("Created new thread with ID:", thread_id)
 
     return thread_id
 
+# Run the requested tool calls concurrently and collect their outputs
+def _run_tool_calls(tool_calls, funcs, debug=False):
+    """
+    Executes the tool calls requested by a run.
+
+    The calls run concurrently on a bounded executor. Each tool gets its own
+    timeout, and a tool that fails or hangs produces an error output instead of
+    stalling the run, so all outputs can still be submitted together. A tool
+    still running at its timeout cannot be stopped, so the executor is
+    replaced to keep the hung worker from reducing later calls' capacity.
+
+    Args:
+        tool_calls (list): The tool calls from the run's required action.
+        funcs (ToolRegistry or list): The tools the run may call.
+        debug (bool, optional): Whether to print debug information. Defaults to False.
+
+    Returns:
+        list: The tool outputs to submit back to the run, in the order of the tool calls.
+    """
+
+    tools = as_registry(funcs)
+    executor = tool_executor
+    pending = []
+
+    for tool_call in tool_calls:
+        if debug:
+            print("Tool call function:", tool_call.function)
+
+        future = None
+        output = None
+        status = "ok"
+        tool = tools.get(tool_call.function.name)
+        if tool is None:
+            if debug:
+                print(f"No matching function for {tool_call.function.name}")
+            output = f"Error: unknown tool {tool_call.function.name}"
+            status = "unknown"
+        else:
+            try:
+                kwargs = tool.parse_arguments(tool_call.function.arguments)
+                future = executor.submit(tool.func, **kwargs)
+            except ToolError as e:
+                output = "Error: " + str(e)
+                status = "invalid"
+
+        timeout = tool.timeout if tool is not None and tool.timeout else DEFAULT_TOOL_TIMEOUT
+        pending.append((tool_call, future, output, status, time.monotonic() + timeout))
+
+    tool_outputs = []
+
+    for tool_call, future, output, status, deadline in pending:
+        if future is not None:
+            try:
+                output = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                if not future.cancel():
+                    _abandon_tool_executor(executor)
+                output = f"Error: {tool_call.function.name} timed out"
+                status = "timeout"
+            except Exception as e:
+                output = "Error: " + str(e)
+                status = "error"
+
+        TOOL_CALLS.inc(tool=tool_call.function.name, status=status)
+
+        if debug:
+            print(f"{tool_call.function.name}: ", output)
+
+        tool_outputs.append(
+            {
+                "tool_call_id": tool_call.id,
+                "output": json.dumps(output)
+            }
+        )
+
+    return tool_outputs
+
+# A running thread cannot be stopped, so a hung tool keeps its worker until it returns.
+# The executor it runs on is left to the hung tools and later calls get a fresh one.
+# It is not shut down, since a concurrent call may still be submitting to it; once
+# the last such call drops it, its idle workers exit when it is garbage collected.
+def _abandon_tool_executor(executor):
+    global tool_executor
+    with tool_executor_lock:
+        if tool_executor is not executor:
+            return
+        tool_executor = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="tool")
+    logging.warning("A tool call timed out while running; replaced the tool executor")
+
+# Stream response from assistant
+@count_errors("stream_completion")
+@prioritized
+def stream_completion(assistant_id, thread_id, user_input, funcs, debug=False, priority="normal"):
+    """
+    Executes a completion request and yields the reply text as it is generated.
+
+    Tool calls requested by the run are executed inside the stream and their
+    outputs are submitted on a follow-up stream, so the caller only sees text.
+
+    Args:
+        assistant_id (str): The ID of the assistant.
+        thread_id (str): The ID of the thread.
+        user_input (str): The user input content.
+        funcs (ToolRegistry or list): The tools the run may call.
+        debug (bool, optional): Whether to print debug information. Defaults to False.
+        priority (str, optional): The rate limiter class of the run's requests: "interactive", "normal" or "background". Defaults to "normal".
+
+    Yields:
+        str: The next piece of the assistant's reply.
+    """
+
+    if debug:
+        print("Streaming completion for user input:", user_input)
+
+    queue_start = time.perf_counter()
+    with run_queue.acquire(thread_id):
+        observe_phase("stream_completion", "queue_wait", time.perf_counter() - queue_start)
+
+        # Create message
+        with phase_timer("stream_completion", "message_create"):
+            client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_input
+            )
+        store = get_conversation_store()
+        store.add_message(thread_id, "user", user_input)
+        parts = []
+
+        # Create run as an event stream
+        model_start = time.perf_counter()
+        stream = client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            stream=True
+        )
+
+        while stream is not None:
+            next_stream = None
+            with stream:
+                for event in stream:
+                    if event.event == "thread.message.delta":
+                        for part in event.data.delta.content or []:
+                            if part.type == "text" and part.text and part.text.value:
+                                parts.append(part.text.value)
+                                yield part.text.value
+
+                    elif event.event == "thread.run.requires_action":
+                        observe_phase("stream_completion", "model", time.perf_counter() - model_start)
+                        run = event.data
+                        with phase_timer("stream_completion", "tool_execution"):
+                            tool_outputs = _run_tool_calls(run.required_action.submit_tool_outputs.tool_calls, funcs, debug)
+                        model_start = time.perf_counter()
+                        next_stream = client.beta.threads.runs.submit_tool_outputs(
+                            thread_id=thread_id,
+                            run_id=run.id,
+                            tool_outputs=tool_outputs,
+                            stream=True
+                        )
+                        break
+
+                    elif event.event in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired"):
+                        RUNS.inc(function="stream_completion", status=event.data.status)
+                        raise Exception("Run Failed. Error: ", event.data.last_error)
+
+                    elif event.event == "thread.run.completed":
+                        observe_phase("stream_completion", "model", time.perf_counter() - model_start)
+                        RUNS.inc(function="stream_completion", status="completed")
+                        store.add_message(thread_id, "assistant", "".join(parts), run_id=event.data.id)
+
+                    elif debug and event.event.startswith("thread.run."):
+                        print("Run status:", event.data.status)
+
+            stream = next_stream
+
 # Get response from assistant
-def get_completion(assistant_id, thread_id, user_input, funcs, debug=False):
+@count_errors("get_completion")
+@prioritized
+def get_completion(assistant_id, thread_id, user_input, funcs, debug=False, stream=False, on_delta=None, use_cache=False, cache_ttl=RESPONSE_CACHE_TTL, priority="normal"):
     """
     Executes a completion request with the given parameters.
 
     Args:
         assistant_id (str): The ID of the assistant.
-        thread_id (str): The ID of the thread.
+        thread_id (str or callable): The ID of the thread, or a function returning it, called only if a run is needed (e.g. lambda: session.thread_id, so a cache hit creates no thread).
         user_input (str): The user input content.
-        funcs (list): A list of functions.
+        funcs (ToolRegistry or list): The tools the run may call.
         debug (bool, optional): Whether to print debug information. Defaults to False.
+        stream (bool, optional): Whether to use the run event stream instead of polling. Defaults to False.
+        on_delta (callable, optional): Called with each piece of reply text as it arrives. Implies stream. Defaults to None.
+        use_cache (bool, optional): Whether to reuse a stored reply to the same prompt. Only use for prompts whose answer does not depend on the conversation. Defaults to False.
+        cache_ttl (float, optional): Seconds a reply stored by this call stays valid. Defaults to RESPONSE_CACHE_TTL.
+        priority (str, optional): The rate limiter class of the run's requests: "interactive", "normal" or "background". Defaults to "normal".
 
     Returns:
         str: The message as a response to the completion request.
     """
 
+    if use_cache:
+        cache = get_response_cache()
+        # An assistant's model and instructions are fixed once it is created, so its ID stands for them
+        cache_key = cache.make_key(user_input, assistant_id=assistant_id)
+        message = cache.get(cache_key)
+        if message is not None:
+            if debug:
+                print("Loaded response from cache for user input:", user_input)
+            if on_delta is not None and isinstance(message, str):
+                on_delta(message)
+            return message
+
+        message = get_completion.__wrapped__(assistant_id, thread_id, user_input, funcs, debug, stream, on_delta, priority=priority)
+        if message:
+            cache.set(cache_key, message, cache_ttl)
+        return message
+
+    if callable(thread_id):
+        thread_id = thread_id()
+
+    if stream or on_delta is not None:
+        parts = []
+        for delta in stream_completion(assistant_id, thread_id, user_input, funcs, debug, priority=priority):
+            parts.append(delta)
+            if on_delta is not None:
+                on_delta(delta)
+        return _format_reply("".join(parts), debug)
+
     if debug:
         print("Getting completion for user input:", user_input)
 
-    # Create message
-    message = client.beta.threads.messages.create(
-        thread_id=thread_id,
-        role="user",
-        content=user_input
-    )
-
-    # Create run
-    run = client.beta.threads.runs.create(
-      thread_id=thread_id,
-      assistant_id=assistant_id,
-    )
+    queue_start = time.perf_counter()
+    with run_queue.acquire(thread_id):
+        observe_phase("get_completion", "queue_wait", time.perf_counter() - queue_start)
 
-    # Run
-    while True:
-        while run.status in ['queued', 'in_progress']:
-            run = client.beta.threads.runs.retrieve(
+        # Create message
+        with phase_timer("get_completion", "message_create"):
+            message = client.beta.threads.messages.create(
                 thread_id=thread_id,
-                run_id=run.id
+                role="user",
+                content=user_input
             )
-            if debug:
-                print("Run status:", run.status)
-            time.sleep(1)
-        
-        if run.status == "requires_action":
-            tool_calls = run.required_action.submit_tool_outputs.tool_calls
-            tool_outputs = []
+        store = get_conversation_store()
+        store.add_message(thread_id, "user", user_input)
 
-            for tool_call in tool_calls:
-                if debug:
-                    print("Tool call function:", tool_call.function)
-                try:
-                    func = next(iter([func for func in funcs if func.__name__ == tool_call.function.name]))
-                    try:
-                        output = func(**eval(tool_call.function.arguments))
-                    except Exception as e:
-                        output = "Error: " + str(e)
-
-                    if debug:
-                        print(f"{tool_call.function.name}: ", output)
-                    
-                    tool_outputs.append(
-                        {
-                            "tool_call_id": tool_call.id, 
-                            "output": json.dumps(output)
-                        }
-                    )
+        # Create run
+        model_start = time.perf_counter()
+        run = client.beta.threads.runs.create(
+          thread_id=thread_id,
+          assistant_id=assistant_id,
+        )
 
-                except StopIteration:
-                    if debug:
-                        print(f"No matching function for {tool_call.function.name}")
-                    continue  # Skip this tool call if no matching function is found
+        # Run
+        while True:
+            while run.status in ['queued', 'in_progress']:
+                run = client.beta.threads.runs.retrieve(
+                    thread_id=thread_id,
+                    run_id=run.id
+                )
+                if debug:
+                    print("Run status:", run.status)
+                time.sleep(1)
+            observe_phase("get_completion", "model", time.perf_counter() - model_start)
+        
+            if run.status == "requires_action":
+                tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                with phase_timer("get_completion", "tool_execution"):
+                    tool_outputs = _run_tool_calls(tool_calls, funcs, debug)
                     
-            run = client.beta.threads.runs.submit_tool_outputs(
-                thread_id=thread_id,
-                run_id=run.id,
-                tool_outputs=tool_outputs
-            )
+                model_start = time.perf_counter()
+                run = client.beta.threads.runs.submit_tool_outputs(
+                    thread_id=thread_id,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs
+                )
 
-        elif run.status == "failed":
-            raise Exception("Run Failed. Error: ", run.last_error)
+            elif run.status == "failed":
+                RUNS.inc(function="get_completion", status="failed")
+                raise Exception("Run Failed. Error: ", run.last_error)
         
-        else:
-            messages = client.beta.threads.messages.list(
-                thread_id=thread_id
-            )
-            message = messages.data[0].content[0].text.value
-            pattern = r"/imgs/\d{10}\.png"
-            match = re.search(pattern, message)
-            if match:
-                message = {"image": match.group()}
-            if debug:
-                print(message)
-            return message
+            else:
+                with phase_timer("get_completion", "message_retrieve"):
+                    content = get_run_content(thread_id, run.id)
+                RUNS.inc(function="get_completion", status=run.status)
+                message = content_text(content)
+                store.add_message(thread_id, "assistant", message, run_id=run.id)
+                return _format_reply(message, debug)
+
+# Fetch only the reply created by a run
+def get_run_content(thread_id, run_id):
+    """
+    Fetches the content of the newest assistant message created by a run.
+
+    Only the run's own messages are requested, newest first, so the payload
+    does not grow with the length of the thread.
+
+    Args:
+        thread_id (str): The ID of the thread.
+        run_id (str): The ID of the finished run.
+
+    Returns:
+        list: The typed content parts of the message (text, image_file, ...). Empty if the run created no message.
+    """
+
+    messages = client.beta.threads.messages.list(
+        thread_id=thread_id,
+        run_id=run_id,
+        order="desc",
+        limit=RUN_MESSAGES_LIMIT
+    )
+    for message in messages.data:
+        if message.role == "assistant":
+            return message.content
+    return []
+
+# Join the text parts of a message's content
+def content_text(content):
+    return "".join(part.text.value for part in content if part.type == "text")
+
+# Turn generated image paths into an image reply
+def _format_reply(message, debug=False):
+    pattern = r"/imgs/\d{10}\.png"
+    match = re.search(pattern, message)
+    if match:
+        message = {"image": match.group()}
+    if debug:
+        print(message)
+    return message
         
 # AI Scheduler 
-def suggest_time_for_event(assistant_id, thread_id, event_description, duration_minutes, funcs, debug=False):
+def suggest_time_for_event(assistant_id, thread_id, event_description, duration_minutes, funcs, debug=False, priority="normal"):
     prompt = f"""
     I need to schedule an event: {event_description}.
     The event should last for {duration_minutes} minutes.
     Please suggest an optimal time based on my availability.
     """
-    return get_completion(assistant_id, thread_id, prompt, funcs, debug)
+    return get_completion(assistant_id, thread_id, prompt, funcs, debug, priority=priority)
 
 # Function to upload file and analyze it
-def analyze_file(assistant_id, thread_id, file_path, funcs, debug=False):
+@prioritized
+def analyze_file(assistant_id, thread_id, file_path, funcs, debug=False, priority="normal"):
     # Upload the file
     try:
-        file = client.files.create(
-            file=open(file_path, "rb"),
-            purpose='user_data'  # Change purpose to a valid option
-        )
+        with phase_timer("analyze_file", "file_upload"):
+            file = client.files.create(
+                file=open(file_path, "rb"),
+                purpose='user_data'  # Change purpose to a valid option
+            )
         file_id = file.id
 
         if debug:
             logging.info(f"File uploaded successfully with ID: {file_id}")
     except Exception as e:
+        ERRORS.inc(function="analyze_file")
         logging.error(f"Error uploading file: {e}")
         return f"Error uploading file: {e}"
 
-    # Create message with the uploaded file
-    try:
-        message = client.beta.threads.messages.create(
-            thread_id=thread_id,
-            role="user",
-            content="Please analyze the attached file.",
-            attachments=[{
-                "file_id": file_id,
-                "tools": [{"type": "file_search"}]  # Add the required tools parameter with type as an object
-            }]
-        )
+    queue_start = time.perf_counter()
+    with run_queue.acquire(thread_id):
+        observe_phase("analyze_file", "queue_wait", time.perf_counter() - queue_start)
 
-        run = client.beta.threads.runs.create(
-            thread_id=thread_id,
-            assistant_id=assistant_id,
-        )
+        # Create message with the uploaded file
+        try:
+            with phase_timer("analyze_file", "message_create"):
+                message = client.beta.threads.messages.create(
+                    thread_id=thread_id,
+                    role="user",
+                    content="Please analyze the attached file.",
+                    attachments=[{
+                        "file_id": file_id,
+                        "tools": [{"type": "file_search"}]  # Add the required tools parameter with type as an object
+                    }]
+                )
+            store = get_conversation_store()
+            store.add_message(thread_id, "user", f"Please analyze the attached file. ({os.path.basename(file_path)})")
 
-        # Poll for the run status
-        while True:
-            run = client.beta.threads.runs.retrieve(
+            model_start = time.perf_counter()
+            run = client.beta.threads.runs.create(
                 thread_id=thread_id,
-                run_id=run.id
+                assistant_id=assistant_id,
             )
-            if run.status == "requires_action":
-                tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                tool_outputs = []
 
-                for tool_call in tool_calls:
-                    func = next(iter([func for func in funcs if func.__name__ == tool_call.function.name]))
-                    output = func(**json.loads(tool_call.function.arguments))
-                    tool_outputs.append({
-                        "tool_call_id": tool_call.id,
-                        "output": json.dumps(output)
-                    })
-
-                run = client.beta.threads.runs.submit_tool_outputs(
+            # Poll for the run status
+            while True:
+                run = client.beta.threads.runs.retrieve(
                     thread_id=thread_id,
-                    run_id=run.id,
-                    tool_outputs=tool_outputs
+                    run_id=run.id
                 )
+                if run.status == "requires_action":
+                    observe_phase("analyze_file", "model", time.perf_counter() - model_start)
+                    tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                    with phase_timer("analyze_file", "tool_execution"):
+                        tool_outputs = _run_tool_calls(tool_calls, funcs, debug)
+
+                    model_start = time.perf_counter()
+                    run = client.beta.threads.runs.submit_tool_outputs(
+                        thread_id=thread_id,
+                        run_id=run.id,
+                        tool_outputs=tool_outputs
+                    )
 
-            elif run.status == "completed":
-                messages = client.beta.threads.messages.list(
-                    thread_id=thread_id
-                )
-                message = messages.data[-1].content
-                return message
+                elif run.status == "completed":
+                    observe_phase("analyze_file", "model", time.perf_counter() - model_start)
+                    with phase_timer("analyze_file", "message_retrieve"):
+                        content = get_run_content(thread_id, run.id)
+                    RUNS.inc(function="analyze_file", status="completed")
+                    store.add_message(thread_id, "assistant", content_text(content), run_id=run.id)
+                    return content
 
-            elif run.status == "failed":
-                raise Exception(f"Run failed with error: {run.last_error}")
+                elif run.status == "failed":
+                    RUNS.inc(function="analyze_file", status="failed")
+                    raise Exception(f"Run failed with error: {run.last_error}")
 
-            time.sleep(1)
+                time.sleep(1)
 
-    except Exception as e:
-        logging.error(f"Error analyzing file: {e}")
-        return f"Error analyzing file: {e}"
+        except Exception as e:
+            ERRORS.inc(function="analyze_file")
+            logging.error(f"Error analyzing file: {e}")
+            return f"Error analyzing file: {e}"
 
 # Function to analyze the image
-def analyze_image(file_path, debug=False):
+def analyze_image(file_path, debug=False, priority="normal"):
 
     headers = {
         "Content-Type": "application/json",
@@ -330,15 +613,26 @@ def analyze_image(file_path, debug=False):
     }
 
     try:
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+        # Goes through the rate limiter like the client's requests, retrying after a 429
+        tokens = estimate_chat_tokens(payload)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            with phase_timer("analyze_image", "rate_limit_wait"):
+                scheduler.acquire(priority, tokens)
+            with phase_timer("analyze_image", "request"):
+                response = http_client.post(f"{client.base_url}chat/completions", headers=headers, json=payload, timeout=(3.05, 60))
+            scheduler.record_response(response.status_code, response.headers)
+            if response.status_code != 429:
+                break
         response_json = response.json()
 
         if debug:
             logging.info(f"OpenAI API response: {response_json}")
 
         message_content = response_json['choices'][0]['message']['content']
+        RUNS.inc(function="analyze_image", status="completed")
         return message_content
 
     except Exception as e:
+        ERRORS.inc(function="analyze_image")
         logging.error(f"Error analyzing image: {e}")
         return f"Error analyzing image: {e}"
\ No newline at end of file
@@ -0,0 +1,86 @@
+import time
+import threading
+
+class AssistantSession:
+    """
+    The assistant and thread shared by every feature of the process.
+
+    Background work such as goal reports runs on a second thread,
+    background_thread_id, so an interactive chat never waits in the run queue
+    behind it.
+
+    Nothing is loaded or created until assistant_id or a thread ID is first
+    read, so importing a module that holds a session costs no OpenAI calls,
+    and the OpenAI client library itself is not imported until then either.
+    The properties are safe to read from several threads at once; only the
+    first reader does the work.
+    """
+
+    def __init__(self, name="Holo", instructions="You are a helpful assistant.", model="gpt-4o", debug=True):
+        self.name = name
+        self.instructions = instructions
+        self.model = model
+        self.debug = debug
+        self._assistant_id = None
+        self._thread_id = None
+        self._background_thread_id = None
+        self._lock = threading.RLock()
+        self.created_at = time.perf_counter()
+        self.first_used_at = None
+
+    @property
+    def assistant_id(self):
+        if self._assistant_id is None:
+            with self._lock:
+                if self._assistant_id is None:
+                    self._mark_used()
+                    from assistant import create_assistant
+                    self._assistant_id = create_assistant(name=self.name, instructions=self.instructions, model=self.model)
+        return self._assistant_id
+
+    @property
+    def thread_id(self):
+        if self._thread_id is None:
+            with self._lock:
+                if self._thread_id is None:
+                    self._mark_used()
+                    from assistant import create_thread
+                    self._thread_id = create_thread(debug=self.debug)
+        return self._thread_id
+
+    @property
+    def background_thread_id(self):
+        if self._background_thread_id is None:
+            with self._lock:
+                if self._background_thread_id is None:
+                    self._mark_used()
+                    from assistant import create_thread
+                    self._background_thread_id = create_thread(debug=self.debug)
+        return self._background_thread_id
+
+    @property
+    def loaded_thread_id(self):
+        """The thread ID if the thread has been created, else None; never creates one."""
+        return self._thread_id
+
+    def is_initialized(self):
+        """Returns True once the assistant or thread has been loaded."""
+        return self._assistant_id is not None or self._thread_id is not None or self._background_thread_id is not None
+
+    def _mark_used(self):
+        if self.first_used_at is None:
+            self.first_used_at = time.perf_counter()
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_assistant_session():
+    """
+    Returns the process-wide assistant session, creating the (still unloaded) session object on first call.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = AssistantSession()
+    return _session
@@ -0,0 +1,359 @@
+import os
+import time
+import asyncio
+import logging
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from dotenv import load_dotenv
+from assistant import RUN_MESSAGES_LIMIT, thread_pool, _run_tool_calls, _format_reply, content_text
+from conversation_store import get_conversation_store
+from run_queue import run_queue
+from metrics import RUNS, ERRORS, phase_timer, observe_phase, count_errors
+from rate_limiter import prioritized, async_event_hooks
+
+# Load environment variables
+load_dotenv()
+
+# Load OpenAI API key
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Create async OpenAI client; it shares the rate limiter with the sync client
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=600, http_client=DefaultAsyncHttpxClient(event_hooks=async_event_hooks()))
+
+# Create thread
+async def acreate_thread(debug=False):
+    """
+    Creates a new thread without blocking the event loop, taking a pre-created one from the warm pool when one is ready.
+
+    Returns:
+        str: The ID of the created thread.
+    """
+
+    thread_id = thread_pool.take()
+    if thread_id is None:
+        thread = await client.beta.threads.create()
+        thread_id = thread.id
+
+    if debug:
+        print("Created new thread with ID:", thread_id)
+
+    return thread_id
+
+# Stream run events from assistant
+@count_errors("astream_events")
+@prioritized
+async def astream_events(assistant_id, thread_id, user_input, funcs, debug=False, priority="normal"):
+    """
+    Executes a completion request and yields progress events as they happen.
+
+    Tool calls are blocking functions, so they run in a worker thread while
+    the event loop keeps serving other requests.
+
+    Args:
+        assistant_id (str): The ID of the assistant.
+        thread_id (str): The ID of the thread.
+        user_input (str): The user input content.
+        funcs (ToolRegistry or list): The tools the run may call.
+        debug (bool, optional): Whether to print debug information. Defaults to False.
+        priority (str, optional): The rate limiter class of the run's requests: "interactive", "normal" or "background". Defaults to "normal".
+
+    Yields:
+        dict: An event with a "type" of "status" (run status changed), "delta"
+        (new reply text), "tool_call" (a tool started), "tool_output" (a tool
+        finished) or "done" (the run completed).
+    """
+
+    if debug:
+        print("Streaming completion for user input:", user_input)
+
+    queue_start = time.perf_counter()
+    async with run_queue.aacquire(thread_id):
+        observe_phase("astream_events", "queue_wait", time.perf_counter() - queue_start)
+
+        # Create message
+        with phase_timer("astream_events", "message_create"):
+            await client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_input
+            )
+        store = get_conversation_store()
+        await asyncio.to_thread(store.add_message, thread_id, "user", user_input)
+        parts = []
+
+        # Create run as an event stream
+        model_start = time.perf_counter()
+        stream = await client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            stream=True
+        )
+
+        while stream is not None:
+            next_stream = None
+            async with stream:
+                async for event in stream:
+                    if event.event == "thread.message.delta":
+                        for part in event.data.delta.content or []:
+                            if part.type == "text" and part.text and part.text.value:
+                                parts.append(part.text.value)
+                                yield {"type": "delta", "text": part.text.value}
+
+                    elif event.event == "thread.run.requires_action":
+                        observe_phase("astream_events", "model", time.perf_counter() - model_start)
+                        run = event.data
+                        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                        for tool_call in tool_calls:
+                            yield {"type": "tool_call", "id": tool_call.id, "name": tool_call.function.name}
+
+                        with phase_timer("astream_events", "tool_execution"):
+                            tool_outputs = await asyncio.to_thread(_run_tool_calls, tool_calls, funcs, debug)
+                        names = {tool_call.id: tool_call.function.name for tool_call in tool_calls}
+                        for tool_output in tool_outputs:
+                            yield {
+                                "type": "tool_output",
+                                "id": tool_output["tool_call_id"],
+                                "name": names.get(tool_output["tool_call_id"]),
+                                "error": tool_output["output"].startswith('"Error:'),
+                            }
+
+                        model_start = time.perf_counter()
+                        next_stream = await client.beta.threads.runs.submit_tool_outputs(
+                            thread_id=thread_id,
+                            run_id=run.id,
+                            tool_outputs=tool_outputs,
+                            stream=True
+                        )
+                        break
+
+                    elif event.event in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired"):
+                        RUNS.inc(function="astream_events", status=event.data.status)
+                        raise Exception("Run Failed. Error: ", event.data.last_error)
+
+                    elif event.event == "thread.run.completed":
+                        observe_phase("astream_events", "model", time.perf_counter() - model_start)
+                        RUNS.inc(function="astream_events", status="completed")
+                        await asyncio.to_thread(store.add_message, thread_id, "assistant", "".join(parts), event.data.id)
+                        yield {"type": "done", "run_id": event.data.id}
+
+                    elif event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step"):
+                        if debug:
+                            print("Run status:", event.data.status)
+                        yield {"type": "status", "status": event.data.status}
+
+            stream = next_stream
+
+# Stream response from assistant
+async def astream_completion(assistant_id, thread_id, user_input, funcs, debug=False, priority="normal"):
+    """
+    Executes a completion request and yields the reply text as it is generated.
+
+    Args:
+        assistant_id (str): The ID of the assistant.
+        thread_id (str): The ID of the thread.
+        user_input (str): The user input content.
+        funcs (ToolRegistry or list): The tools the run may call.
+        debug (bool, optional): Whether to print debug information. Defaults to False.
+        priority (str, optional): The rate limiter class of the run's requests: "interactive", "normal" or "background". Defaults to "normal".
+
+    Yields:
+        str: The next piece of the assistant's reply.
+    """
+
+    async for event in astream_events(assistant_id, thread_id, user_input, funcs, debug, priority=priority):
+        if event["type"] == "delta":
+            yield event["text"]
+
+# Get response from assistant
+@count_errors("aget_completion")
+@prioritized
+async def aget_completion(assistant_id, thread_id, user_input, funcs, debug=False, stream=False, on_delta=None, priority="normal"):
+    """
+    Executes a completion request without blocking the event loop.
+
+    Args:
+        assistant_id (str): The ID of the assistant.
+        thread_id (str): The ID of the thread.
+        user_input (str): The user input content.
+        funcs (ToolRegistry or list): The tools the run may call.
+        debug (bool, optional): Whether to print debug information. Defaults to False.
+        stream (bool, optional): Whether to use the run event stream instead of polling. Defaults to False.
+        on_delta (callable, optional): Called with each piece of reply text as it arrives. Implies stream. Defaults to None.
+        priority (str, optional): The rate limiter class of the run's requests: "interactive", "normal" or "background". Defaults to "normal".
+
+    Returns:
+        str: The message as a response to the completion request.
+    """
+
+    if stream or on_delta is not None:
+        parts = []
+        async for delta in astream_completion(assistant_id, thread_id, user_input, funcs, debug, priority=priority):
+            parts.append(delta)
+            if on_delta is not None:
+                on_delta(delta)
+        return _format_reply("".join(parts), debug)
+
+    if debug:
+        print("Getting completion for user input:", user_input)
+
+    queue_start = time.perf_counter()
+    async with run_queue.aacquire(thread_id):
+        observe_phase("aget_completion", "queue_wait", time.perf_counter() - queue_start)
+
+        # Create message
+        with phase_timer("aget_completion", "message_create"):
+            await client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_input
+            )
+        store = get_conversation_store()
+        await asyncio.to_thread(store.add_message, thread_id, "user", user_input)
+
+        # Create run
+        model_start = time.perf_counter()
+        run = await client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+        )
+
+        # Run
+        while True:
+            while run.status in ['queued', 'in_progress']:
+                await asyncio.sleep(1)
+                run = await client.beta.threads.runs.retrieve(
+                    thread_id=thread_id,
+                    run_id=run.id
+                )
+                if debug:
+                    print("Run status:", run.status)
+            observe_phase("aget_completion", "model", time.perf_counter() - model_start)
+
+            if run.status == "requires_action":
+                tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                with phase_timer("aget_completion", "tool_execution"):
+                    tool_outputs = await asyncio.to_thread(_run_tool_calls, tool_calls, funcs, debug)
+
+                model_start = time.perf_counter()
+                run = await client.beta.threads.runs.submit_tool_outputs(
+                    thread_id=thread_id,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs
+                )
+
+            elif run.status == "failed":
+                RUNS.inc(function="aget_completion", status="failed")
+                raise Exception("Run Failed. Error: ", run.last_error)
+
+            else:
+                with phase_timer("aget_completion", "message_retrieve"):
+                    content = await aget_run_content(thread_id, run.id)
+                RUNS.inc(function="aget_completion", status=run.status)
+                message = content_text(content)
+                await asyncio.to_thread(store.add_message, thread_id, "assistant", message, run.id)
+                return _format_reply(message, debug)
+
+# Fetch only the reply created by a run
+async def aget_run_content(thread_id, run_id):
+    """
+    Fetches the content of the newest assistant message created by a run.
+
+    Args:
+        thread_id (str): The ID of the thread.
+        run_id (str): The ID of the finished run.
+
+    Returns:
+        list: The typed content parts of the message. Empty if the run created no message.
+    """
+
+    messages = await client.beta.threads.messages.list(
+        thread_id=thread_id,
+        run_id=run_id,
+        order="desc",
+        limit=RUN_MESSAGES_LIMIT
+    )
+    for message in messages.data:
+        if message.role == "assistant":
+            return message.content
+    return []
+
+# Function to upload file and analyze it
+@prioritized
+async def aanalyze_file(assistant_id, thread_id, file_path, funcs, debug=False, priority="normal"):
+    # Upload the file
+    try:
+        with open(file_path, "rb") as f, phase_timer("aanalyze_file", "file_upload"):
+            file = await client.files.create(
+                file=f,
+                purpose='user_data'
+            )
+        file_id = file.id
+
+        if debug:
+            logging.info(f"File uploaded successfully with ID: {file_id}")
+    except Exception as e:
+        ERRORS.inc(function="aanalyze_file")
+        logging.error(f"Error uploading file: {e}")
+        return f"Error uploading file: {e}"
+
+    queue_start = time.perf_counter()
+    async with run_queue.aacquire(thread_id):
+        observe_phase("aanalyze_file", "queue_wait", time.perf_counter() - queue_start)
+
+        # Create message with the uploaded file
+        try:
+            with phase_timer("aanalyze_file", "message_create"):
+                await client.beta.threads.messages.create(
+                    thread_id=thread_id,
+                    role="user",
+                    content="Please analyze the attached file.",
+                    attachments=[{
+                        "file_id": file_id,
+                        "tools": [{"type": "file_search"}]
+                    }]
+                )
+            store = get_conversation_store()
+            await asyncio.to_thread(store.add_message, thread_id, "user", f"Please analyze the attached file. ({os.path.basename(file_path)})")
+
+            model_start = time.perf_counter()
+            run = await client.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+            )
+
+            # Poll for the run status
+            while True:
+                run = await client.beta.threads.runs.retrieve(
+                    thread_id=thread_id,
+                    run_id=run.id
+                )
+                if run.status == "requires_action":
+                    observe_phase("aanalyze_file", "model", time.perf_counter() - model_start)
+                    tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                    with phase_timer("aanalyze_file", "tool_execution"):
+                        tool_outputs = await asyncio.to_thread(_run_tool_calls, tool_calls, funcs, debug)
+
+                    model_start = time.perf_counter()
+                    run = await client.beta.threads.runs.submit_tool_outputs(
+                        thread_id=thread_id,
+                        run_id=run.id,
+                        tool_outputs=tool_outputs
+                    )
+
+                elif run.status == "completed":
+                    observe_phase("aanalyze_file", "model", time.perf_counter() - model_start)
+                    with phase_timer("aanalyze_file", "message_retrieve"):
+                        content = await aget_run_content(thread_id, run.id)
+                    RUNS.inc(function="aanalyze_file", status="completed")
+                    await asyncio.to_thread(store.add_message, thread_id, "assistant", content_text(content), run.id)
+                    return content
+
+                elif run.status == "failed":
+                    RUNS.inc(function="aanalyze_file", status="failed")
+                    raise Exception(f"Run failed with error: {run.last_error}")
+
+                await asyncio.sleep(1)
+
+        except Exception as e:
+            ERRORS.inc(function="aanalyze_file")
+            logging.error(f"Error analyzing file: {e}")
+            return f"Error analyzing file: {e}"
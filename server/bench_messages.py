@@ -0,0 +1,50 @@
+import sys
+import time
+from assistant import client, create_assistant, create_thread, get_completion, RUN_MESSAGES_LIMIT
+
+# Filler text so each message has a realistic size
+FILLER = "This is an earlier turn of the conversation that the reply fetch should not download. " * 10
+
+# Time one messages.list call and measure its response body
+def measure_list(thread_id, **params):
+    start = time.perf_counter()
+    response = client.beta.threads.messages.with_raw_response.list(thread_id=thread_id, **params)
+    elapsed = time.perf_counter() - start
+    return len(response.http_response.content), elapsed
+
+def run_benchmark(sizes=(10, 50, 100), rounds=5):
+    """
+    Compares listing the whole thread with fetching only the run's reply as the thread grows.
+
+    Args:
+        sizes (tuple, optional): The thread lengths (in messages) to measure at.
+        rounds (int, optional): The number of timed calls per measurement.
+    """
+
+    assistant_id = create_assistant(name="Holo", instructions="You are a helpful assistant.", model="gpt-4o")
+    thread_id = create_thread()
+
+    # One real run, so there is a run id to filter on
+    get_completion(assistant_id, thread_id, "Reply with one word.", [])
+    run_id = client.beta.threads.runs.list(thread_id=thread_id, limit=1).data[0].id
+
+    message_count = 2
+    print(f"{'messages':>8} {'full list bytes':>16} {'full list ms':>13} {'run reply bytes':>16} {'run reply ms':>13}")
+    for size in sizes:
+        while message_count < size:
+            client.beta.threads.messages.create(thread_id=thread_id, role="user", content=FILLER)
+            message_count += 1
+
+        full_bytes = run_bytes = 0
+        full_time = run_time = 0.0
+        for _ in range(rounds):
+            nbytes, elapsed = measure_list(thread_id)
+            full_bytes, full_time = nbytes, full_time + elapsed
+            nbytes, elapsed = measure_list(thread_id, run_id=run_id, order="desc", limit=RUN_MESSAGES_LIMIT)
+            run_bytes, run_time = nbytes, run_time + elapsed
+
+        print(f"{size:>8} {full_bytes:>16} {full_time / rounds * 1000:>13.1f} {run_bytes:>16} {run_time / rounds * 1000:>13.1f}")
+
+if __name__ == "__main__":
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or (10, 50, 100)
+    run_benchmark(sizes)
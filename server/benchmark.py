@@ -0,0 +1,207 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import uvicorn
+
+# End-to-end latency and throughput of the assistant module and the FastAPI
+# routes, measured against the local mock in mock_openai.py so runs are
+# repeatable and need no OpenAI access. Compare the numbers before and after
+# a change to polling, streaming or concurrency.
+
+MOCK_PORT = 8100
+API_PORT = 8101
+
+# Start a uvicorn server on a daemon thread and wait until it accepts requests
+def serve_in_thread(app, port):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} failed to start")
+        time.sleep(0.05)
+    return server
+
+def configure_mock(**settings):
+    httpx.post(f"http://127.0.0.1:{MOCK_PORT}/mock/config", json={"reset": True, **settings}).raise_for_status()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def report(name, latencies, wall_time=None, first_tokens=None):
+    """
+    Prints one result row: mean/p50/p95/max latency, and throughput when a wall time is given.
+    """
+    line = (f"{name:<40} n={len(latencies):<3} mean {sum(latencies) / len(latencies):6.3f}s "
+            f"p50 {percentile(latencies, 0.5):6.3f}s p95 {percentile(latencies, 0.95):6.3f}s max {max(latencies):6.3f}s")
+    if first_tokens:
+        line += f"  ttft p50 {percentile(first_tokens, 0.5):6.3f}s"
+    if wall_time is not None:
+        line += f"  {len(latencies) / wall_time:6.2f} req/s"
+    print(line)
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+# A local tool so the tool-call path can be measured without network access
+def benchmark_tool(delay=0.1):
+    time.sleep(delay)
+    return {"status": "ok", "delay": delay}
+
+def bench_assistant_module(rounds, concurrency):
+    import assistant
+
+    print("\n== assistant module ==")
+    report("create_assistant", [
+        timed(assistant.create_assistant, name=f"Benchmark {i}", instructions="You are a helpful assistant.")
+        for i in range(rounds)
+    ])
+    report("create_thread (on demand)", [timed(assistant.client.beta.threads.create) for _ in range(rounds)])
+
+    # Give the pool time to refill between calls, so every call is served warm
+    latencies = []
+    for _ in range(rounds):
+        assistant.thread_pool.warm()
+        time.sleep(0.5)
+        latencies.append(timed(assistant.create_thread))
+    report("create_thread (warm pool)", latencies)
+
+    assistant_id = assistant.create_assistant(name="Benchmark", instructions="You are a helpful assistant.")
+    thread_id = assistant.create_thread()
+
+    report("get_completion (polling)", [
+        timed(assistant.get_completion, assistant_id, thread_id, "Hello", []) for _ in range(rounds)
+    ])
+
+    latencies, first_tokens = [], []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        first = []
+        assistant.get_completion(assistant_id, thread_id, "Hello", [],
+                                 on_delta=lambda delta: first or first.append(time.perf_counter() - start))
+        latencies.append(time.perf_counter() - start)
+        first_tokens.extend(first)
+    report("get_completion (streaming)", latencies, first_tokens=first_tokens)
+
+    configure_mock(tool_calls=[{"name": "benchmark_tool", "arguments": {"delay": 0.1}}] * 3)
+    report("get_completion (3 tool calls)", [
+        timed(assistant.get_completion, assistant_id, thread_id, "Hello", [benchmark_tool]) for _ in range(rounds)
+    ])
+    report("get_completion (3 tool calls, stream)", [
+        timed(assistant.get_completion, assistant_id, thread_id, "Hello", [benchmark_tool], stream=True) for _ in range(rounds)
+    ])
+    configure_mock()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("Some notes to analyze.\n" * 100)
+    report("analyze_file", [
+        timed(assistant.analyze_file, assistant_id, thread_id, f.name, []) for _ in range(rounds)
+    ])
+    os.remove(f.name)
+
+    # Independent threads in parallel, then one thread hit from every worker (serialized by the run queue)
+    thread_ids = [assistant.create_thread() for _ in range(concurrency)]
+    for label, targets in ((f"{concurrency} threads in parallel", thread_ids), (f"{concurrency} calls on one thread", [thread_id] * concurrency)):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            latencies = list(executor.map(lambda target: timed(assistant.get_completion, assistant_id, target, "Hello", []), targets))
+            report(label, latencies, wall_time=time.perf_counter() - start)
+
+async def bench_routes(rounds, concurrency):
+    import run
+    serve_in_thread(run.app, API_PORT)
+    base_url = f"http://127.0.0.1:{API_PORT}"
+
+    print("\n== FastAPI routes ==")
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        async def create_thread():
+            response = await client.get("/create_thread")
+            response.raise_for_status()
+            return response.json()["thread_id"]
+
+        async def chat(thread_id):
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"user_input": "Hello", "thread_id": thread_id})
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        async def chat_stream(thread_id):
+            start = time.perf_counter()
+            first_token = None
+            async with client.stream("POST", "/chat/stream", json={"user_input": "Hello", "thread_id": thread_id}) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if first_token is None and line == "event: delta":
+                        first_token = time.perf_counter() - start
+            return time.perf_counter() - start, first_token
+
+        latencies = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await create_thread()
+            latencies.append(time.perf_counter() - start)
+        report("GET /create_thread", latencies)
+
+        thread_id = await create_thread()
+        report("POST /chat", [await chat(thread_id) for _ in range(rounds)])
+
+        results = [await chat_stream(thread_id) for _ in range(rounds)]
+        report("POST /chat/stream", [total for total, _ in results],
+               first_tokens=[first for _, first in results if first is not None])
+
+        thread_ids = [await create_thread() for _ in range(concurrency)]
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*[chat(target) for target in thread_ids])
+        report(f"POST /chat x{concurrency} concurrent", latencies, wall_time=time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[chat_stream(target) for target in thread_ids])
+        report(f"POST /chat/stream x{concurrency} concurrent", [total for total, _ in results],
+               wall_time=time.perf_counter() - start)
+
+def main():
+    global MOCK_PORT, API_PORT
+    parser = argparse.ArgumentParser(description="Benchmark the assistant module and API against the mock OpenAI server.")
+    parser.add_argument("--rounds", type=int, default=5, help="timed calls per measurement")
+    parser.add_argument("--concurrency", type=int, default=10, help="parallel calls in the throughput measurements")
+    parser.add_argument("--mock-port", type=int, default=MOCK_PORT)
+    parser.add_argument("--api-port", type=int, default=API_PORT)
+    parser.add_argument("--skip-routes", action="store_true", help="only benchmark the assistant module")
+    args = parser.parse_args()
+    MOCK_PORT, API_PORT = args.mock_port, args.api_port
+
+    # The OpenAI clients read these when the assistant modules are imported
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{MOCK_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    # The mock has no rate limits, so the client-side limiter should not throttle the measurements
+    os.environ.setdefault("OPENAI_REQUESTS_PER_MINUTE", "1000000")
+    os.environ.setdefault("OPENAI_TOKENS_PER_MINUTE", "1000000000")
+
+    import mock_openai
+    serve_in_thread(mock_openai.app, MOCK_PORT)
+    config = mock_openai.config
+    print(f"Mock OpenAI on port {MOCK_PORT}: queue {config['queue_delay']}s, model {config['model_delay']}s, "
+          f"token {config['token_delay']}s, request {config['request_delay']}s")
+
+    # Keep assistant.json and other working files out of the source tree
+    os.chdir(tempfile.mkdtemp(prefix="holo-benchmark-"))
+
+    bench_assistant_module(args.rounds, args.concurrency)
+    if not args.skip_routes:
+        asyncio.run(bench_routes(args.rounds, args.concurrency))
+
+    import assistant
+    print("\nThread pool:", assistant.thread_pool.stats())
+    print("\nMock requests:", httpx.get(f"http://127.0.0.1:{MOCK_PORT}/mock/stats").json()["requests"])
+
+if __name__ == "__main__":
+    sys.exit(main())
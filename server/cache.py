@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Seconds a persisted cache waits after a change before writing its file, so a burst of sets costs one write
+SAVE_DELAY = 1.0
+
+class TTLCache:
+    """
+    A size-bounded cache whose entries expire after a fixed number of seconds.
+
+    Entries are evicted least recently used first once maxsize is reached. If a
+    persist_path is given, entries are written to that JSON file and loaded
+    back on start, so a restarted process begins with a warm cache. The file
+    is written on a timer thread save_delay seconds after a change, outside
+    the lock, and once more at exit.
+    """
+
+    def __init__(self, ttl, maxsize=128, persist_path=None, save_delay=SAVE_DELAY):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.persist_path = persist_path
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        self._load()
+        if persist_path:
+            atexit.register(self.flush)
+
+    def get(self, key):
+        """
+        Returns (True, value) for a fresh entry, or (False, None) on a miss.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._schedule_save()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self._schedule_save()
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, expires_at, value in entries:
+            if expires_at > now:
+                self._data[key] = (expires_at, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _schedule_save(self):
+        # Caller holds the lock
+        if not self.persist_path:
+            return
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Writes pending changes to persist_path now."""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                entries = [[key, expires_at, value] for key, (expires_at, value) in self._data.items()]
+            # Written under a temporary name, so a crash mid-write leaves the previous file intact
+            tmp_path = self.persist_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.persist_path)
+            except (OSError, TypeError, ValueError):
+                pass
+
+def ttl_cache(ttl, maxsize=128, persist_dir=None, cache_if=None):
+    """
+    Caches the results of a function for ttl seconds.
+
+    Args:
+        ttl (float): How long a result stays fresh, in seconds.
+        maxsize (int, optional): The maximum number of cached results. Defaults to 128.
+        persist_dir (str, optional): Directory to persist the cache in, one JSON file per function. Defaults to None.
+        cache_if (callable, optional): Called with a result; only results it accepts are cached. Defaults to caching anything but None.
+
+    Returns:
+        callable: A decorator. The wrapped function gains cached(), cache_info() and cache_clear().
+    """
+
+    if cache_if is None:
+        cache_if = lambda result: result is not None
+
+    def decorator(func):
+        persist_path = None
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+            persist_path = os.path.join(persist_dir, f"{func.__name__}.json")
+        cache = TTLCache(ttl, maxsize, persist_path)
+
+        def make_key(args, kwargs):
+            return json.dumps([args, sorted(kwargs.items())], default=str)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            hit, value = cache.get(key)
+            if hit:
+                return value
+            result = func(*args, **kwargs)
+            if cache_if(result):
+                cache.set(key, result)
+            return result
+
+        # Returns the fresh cached result for these arguments, or None, without calling func
+        def cached(*args, **kwargs):
+            hit, value = cache.get(make_key(args, kwargs))
+            return value if hit else None
+
+        wrapper.cache = cache
+        wrapper.cached = cached
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
@@ -1,10 +1,14 @@
-import requests
+import http_client
 import json
+import time
 
 BASE_URL = "http://127.0.0.1:8000"
 
+# A reply can take a while when the assistant calls tools
+CHAT_TIMEOUT = 600
+
 def create_thread():
-    response = requests.get(f"{BASE_URL}/create_thread")
+    response = http_client.get(f"{BASE_URL}/create_thread")
     if response.status_code == 200:
         return response.json()["thread_id"]
     else:
@@ -20,7 +24,7 @@ def chat_with_assistant(thread_id, user_input):
     headers = {
         "Content-Type": "application/json"
     }
-    response = requests.post(f"{BASE_URL}/chat", headers=headers, data=json.dumps(payload))
+    response = http_client.post(f"{BASE_URL}/chat", headers=headers, data=json.dumps(payload), timeout=(3.05, CHAT_TIMEOUT))
     if response.status_code == 200:
         return response.json()["message"]
     else:
@@ -28,6 +32,72 @@ def chat_with_assistant(thread_id, user_input):
         print(f"Response: {response.text}")
         return None
 
+# Parse a Server-Sent Events response into (event, data) pairs
+def iter_sse(response):
+    event, data = None, []
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+        elif not line and data:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+def stream_chat_with_assistant(thread_id, user_input):
+    """
+    Sends a message to /chat/stream and prints the reply as it arrives.
+
+    Returns:
+        tuple: The full reply, the time to first token and the total time in seconds (None on error).
+    """
+    payload = {
+        "user_input": user_input,
+        "thread_id": thread_id
+    }
+    start = time.perf_counter()
+    first_token = None
+    parts = []
+    with http_client.post(f"{BASE_URL}/chat/stream", json=payload, stream=True, timeout=(3.05, CHAT_TIMEOUT)) as response:
+        if response.status_code != 200:
+            print(f"Error in chat request: Status code {response.status_code}")
+            print(f"Response: {response.text}")
+            return None, None, None
+
+        print("Assistant: ", end="", flush=True)
+        for event, data in iter_sse(response):
+            if event == "delta":
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(data["text"])
+                print(data["text"], end="", flush=True)
+            elif event == "tool_call":
+                print(f"\n  [calling {data['name']}...]", end="", flush=True)
+            elif event == "tool_output":
+                status = "failed" if data["error"] else "done"
+                print(f"\n  [{data['name']} {status}]\nAssistant: ", end="", flush=True)
+            elif event == "error":
+                print(f"\nError: {data['message']}")
+                return None, first_token, time.perf_counter() - start
+
+    total = time.perf_counter() - start
+    print()
+    return "".join(parts), first_token, total
+
+def print_history(thread_id, limit=20):
+    # Recent turns from the server's local store, without a round trip to OpenAI
+    response = http_client.get(f"{BASE_URL}/threads/{thread_id}/messages", params={"limit": limit})
+    for message in response.json()["messages"]:
+        print(f"{message['role'].capitalize()}: {message['content']}")
+
+def print_search(query):
+    response = http_client.get(f"{BASE_URL}/search", params={"q": query})
+    results = response.json()
+    for message in results:
+        print(f"[{message['thread_id']}] {message['role'].capitalize()}: {message['snippet']}")
+    if not results:
+        print("No messages found.")
+
 if __name__ == "__main__":
     thread_id = create_thread()
     if thread_id:
@@ -37,9 +107,16 @@ if __name__ == "__main__":
             if user_input.lower() in ['exit', 'quit']:
                 print("Ending the chat. Goodbye!")
                 break
-            response = chat_with_assistant(thread_id, user_input)
+            if user_input.lower() == "/history":
+                print_history(thread_id)
+                continue
+            if user_input.lower().startswith("/search "):
+                print_search(user_input[len("/search "):])
+                continue
+            response, first_token, total = stream_chat_with_assistant(thread_id, user_input)
             if response:
-                print(f"Assistant: {response}")
+                if first_token is not None:
+                    print(f"(first token {first_token:.2f}s, total {total:.2f}s)")
             else:
                 print("Failed to get response from assistant")
     else:
@@ -0,0 +1,199 @@
+import os
+import time
+import sqlite3
+import logging
+
+# SQLite file mirroring every conversation turn, relative to the working directory
+CONVERSATION_DB = os.getenv("CONVERSATION_DB", "conversations.db")
+
+# Messages returned per page when no limit is given
+DEFAULT_PAGE_SIZE = 50
+
+class ConversationStore:
+    """
+    A local copy of every user and assistant turn, keyed by thread.
+
+    History can be paged and searched without listing thread messages over
+    the network. Search uses an FTS5 index when SQLite has it, and falls back
+    to LIKE otherwise. A new connection is opened for each operation, so the
+    store can be used from any thread.
+    """
+
+    def __init__(self, db_path=CONVERSATION_DB):
+        self.db_path = db_path
+        self.full_text = False
+        self.initialize_db()
+
+    def initialize_db(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            c = conn.cursor()
+            c.execute('''CREATE TABLE IF NOT EXISTS messages
+                         (id INTEGER PRIMARY KEY AUTOINCREMENT, thread_id TEXT, role TEXT, content TEXT, run_id TEXT, created_at REAL)''')
+            c.execute("CREATE INDEX IF NOT EXISTS messages_thread ON messages (thread_id, id)")
+            try:
+                # External-content index kept in sync by triggers, so the text is stored only once
+                c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id')")
+                c.execute('''CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                             INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content); END''')
+                c.execute('''CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+                             INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END''')
+                self.full_text = True
+            except sqlite3.OperationalError as e:
+                logging.warning(f"SQLite has no FTS5, conversation search falls back to LIKE: {e}")
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Error initializing conversation store: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def add_message(self, thread_id, role, content, run_id=None):
+        """
+        Records one turn of a thread.
+
+        Args:
+            thread_id (str): The ID of the thread.
+            role (str): "user" or "assistant".
+            content (str): The message text.
+            run_id (str, optional): The run that produced an assistant message. Defaults to None.
+
+        Returns:
+            int: The local ID of the message, or None if it could not be stored.
+        """
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            c = conn.cursor()
+            c.execute("INSERT INTO messages (thread_id, role, content, run_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                      (thread_id, role, content, run_id, time.time()))
+            conn.commit()
+            return c.lastrowid
+        except Exception as e:
+            logging.error(f"Error saving message to conversation store: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def get_messages(self, thread_id, limit=DEFAULT_PAGE_SIZE, before=None):
+        """
+        Returns one page of a thread's messages, oldest first.
+
+        Pages are keyed by message ID rather than offset, so new messages do not shift them.
+
+        Args:
+            thread_id (str): The ID of the thread.
+            limit (int, optional): The maximum number of messages. Defaults to DEFAULT_PAGE_SIZE.
+            before (int, optional): Only return messages older than this local message ID. Defaults to None (the newest).
+
+        Returns:
+            dict: "messages", and "before" to pass for the next older page (None on the oldest page).
+        """
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+            c.execute('''SELECT id, thread_id, role, content, run_id, created_at FROM messages
+                         WHERE thread_id = ? AND id < ? ORDER BY id DESC LIMIT ?''',
+                      (thread_id, before if before is not None else 2 ** 63 - 1, limit + 1))
+            rows = [dict(row) for row in c.fetchall()]
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            rows.reverse()
+            return {"messages": rows, "before": rows[0]["id"] if has_more else None}
+        except Exception as e:
+            logging.error(f"Error reading conversation store: {e}")
+            return {"messages": [], "before": None}
+        finally:
+            if conn:
+                conn.close()
+
+    def list_threads(self, limit=DEFAULT_PAGE_SIZE, offset=0):
+        """
+        Returns the stored threads, most recently active first, with their message count and last message.
+        """
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+            c.execute('''SELECT m.thread_id, t.message_count, m.created_at AS last_message_at, m.role AS last_role, m.content AS last_message
+                         FROM (SELECT thread_id, COUNT(*) AS message_count, MAX(id) AS last_id FROM messages GROUP BY thread_id) t
+                         JOIN messages m ON m.id = t.last_id
+                         ORDER BY m.id DESC LIMIT ? OFFSET ?''', (limit, offset))
+            return [dict(row) for row in c.fetchall()]
+        except Exception as e:
+            logging.error(f"Error reading conversation store: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def search(self, query, thread_id=None, limit=20):
+        """
+        Finds messages containing every word of query, best matches first.
+
+        Args:
+            query (str): The words to look for.
+            thread_id (str, optional): Only search this thread. Defaults to None (all threads).
+            limit (int, optional): The maximum number of results. Defaults to 20.
+
+        Returns:
+            list: Matching messages, each with a short "snippet" around the match.
+        """
+        words = query.split()
+        if not words:
+            return []
+
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+            thread_filter = "AND m.thread_id = ?" if thread_id else ""
+            if self.full_text:
+                # Quote every word so punctuation in the query is not read as FTS syntax
+                match = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+                c.execute(f'''SELECT m.id, m.thread_id, m.role, m.content, m.run_id, m.created_at,
+                                     snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet
+                              FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid
+                              WHERE messages_fts MATCH ? {thread_filter}
+                              ORDER BY rank LIMIT ?''',
+                          [match] + ([thread_id] if thread_id else []) + [limit])
+            else:
+                conditions = " AND ".join("m.content LIKE ?" for _ in words)
+                c.execute(f'''SELECT m.id, m.thread_id, m.role, m.content, m.run_id, m.created_at, substr(m.content, 1, 80) AS snippet
+                              FROM messages m WHERE {conditions} {thread_filter}
+                              ORDER BY m.id DESC LIMIT ?''',
+                          [f"%{word}%" for word in words] + ([thread_id] if thread_id else []) + [limit])
+            return [dict(row) for row in c.fetchall()]
+        except Exception as e:
+            logging.error(f"Error searching conversation store: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def delete_thread(self, thread_id):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("DELETE FROM messages WHERE thread_id = ?", (thread_id,))
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Error deleting thread from conversation store: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+_conversation_store = None
+
+# Created on first use, so the database only appears once a conversation happens
+def get_conversation_store():
+    global _conversation_store
+    if _conversation_store is None:
+        _conversation_store = ConversationStore()
+    return _conversation_store
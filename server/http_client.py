@@ -0,0 +1,76 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Default (connect, read) timeouts in seconds for every outbound call
+DEFAULT_TIMEOUT = (3.05, 15)
+
+# Keep-alive pool sizes: number of hosts kept, and connections kept per host
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+
+# Retry idempotent requests on connection errors and transient server errors.
+# Once the retries run out the last response is returned rather than raised,
+# so callers handle it through its status code like any other error response.
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET", "HEAD", "OPTIONS"),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+class TimeoutSession(requests.Session):
+    """A requests session that applies DEFAULT_TIMEOUT unless a call passes its own."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+def create_session():
+    session = TimeoutSession()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=RETRY)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Shared by every module, so connections to the same host are reused
+session = create_session()
+
+def get(url, **kwargs):
+    return session.get(url, **kwargs)
+
+def post(url, **kwargs):
+    return session.post(url, **kwargs)
+
+def connection_stats():
+    """
+    Reports how many requests each host served and how many TCP connections that took.
+
+    Returns:
+        dict: Totals plus a per-host breakdown. reused is the number of requests that did not need a new connection.
+    """
+
+    hosts = {}
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            hosts[host] = {
+                "requests": pool.num_requests,
+                "connections": pool.num_connections,
+                "reused": max(pool.num_requests - pool.num_connections, 0),
+            }
+
+    requests_total = sum(host["requests"] for host in hosts.values())
+    connections_total = sum(host["connections"] for host in hosts.values())
+    return {
+        "requests": requests_total,
+        "connections": connections_total,
+        "reused": max(requests_total - connections_total, 0),
+        "hosts": hosts,
+    }
@@ -0,0 +1,48 @@
+import sys
+import time
+import asyncio
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+# Send one chat request on its own thread and return how long it took
+async def timed_chat(client, user_input):
+    response = await client.get(f"{BASE_URL}/create_thread")
+    thread_id = response.json()["thread_id"]
+
+    start = time.perf_counter()
+    response = await client.post(f"{BASE_URL}/chat", json={"user_input": user_input, "thread_id": thread_id})
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def run_load_test(concurrency, user_input="Say hello in one short sentence."):
+    """
+    Compares a single /chat request against N concurrent ones.
+
+    With the async assistant module the event loop is never blocked, so the
+    concurrent batch should finish in roughly the time of a single request.
+
+    Args:
+        concurrency (int): The number of concurrent /chat requests.
+        user_input (str, optional): The message sent in every request.
+
+    Returns:
+        tuple: The single request latency and the concurrent batch wall time, in seconds.
+    """
+
+    async with httpx.AsyncClient(timeout=600) as client:
+        single = await timed_chat(client, user_input)
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*[timed_chat(client, user_input) for _ in range(concurrency)])
+        batch = time.perf_counter() - start
+
+    print(f"Single request:      {single:.2f}s")
+    print(f"{concurrency} concurrent requests: {batch:.2f}s wall time "
+          f"(min {min(latencies):.2f}s, max {max(latencies):.2f}s)")
+    print(f"Slowdown vs single:  {batch / single:.2f}x")
+    return single, batch
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    asyncio.run(run_load_test(concurrency))
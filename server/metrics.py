@@ -0,0 +1,216 @@
+import time
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a fast message create up to a long run with tools
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+class Counter:
+    """A monotonically increasing count, one per combination of label values."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    """Counts observations into fixed buckets, one set per combination of label values."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes how long the with-block took, even if it raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            return entry[2] if entry else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+# Every metric of the process, in the order they are rendered
+METRICS = []
+
+def register(metric):
+    METRICS.append(metric)
+    return metric
+
+def render_metrics():
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+PHASE_SECONDS = register(Histogram(
+    "holo_assistant_phase_seconds",
+    "Time spent in each phase of an assistant call (message_create, queue_wait, model, tool_execution, message_retrieve, file_upload, rate_limit_wait, request).",
+    ["function", "phase"],
+))
+
+RUNS = register(Counter(
+    "holo_assistant_runs_total",
+    "Assistant calls by function and final status.",
+    ["function", "status"],
+))
+
+TOOL_CALLS = register(Counter(
+    "holo_tool_calls_total",
+    "Tool calls by tool and outcome (ok, error, timeout, invalid, unknown).",
+    ["tool", "status"],
+))
+
+ERRORS = register(Counter(
+    "holo_assistant_errors_total",
+    "Assistant calls that raised or returned an error.",
+    ["function"],
+))
+
+OUTBOUND_WAIT = register(Histogram(
+    "holo_outbound_wait_seconds",
+    "Time an outbound OpenAI request waited for the rate limiter, by priority class.",
+    ["priority"],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60),
+))
+
+RATE_LIMITED = register(Counter(
+    "holo_rate_limited_total",
+    "OpenAI responses with status 429, by the priority class of the request.",
+    ["priority"],
+))
+
+THREAD_POOL_REQUESTS = register(Counter(
+    "holo_thread_pool_requests_total",
+    "New threads handed out, by whether they came from the warm pool or were created on demand.",
+    ["source"],
+))
+
+# Shorthand for the phase histogram
+def phase_timer(function, phase):
+    return PHASE_SECONDS.time(function=function, phase=phase)
+
+def observe_phase(function, phase, seconds):
+    PHASE_SECONDS.observe(seconds, function=function, phase=phase)
+
+# Count an error once, under the innermost decorated function it passed through,
+# so a completion that fails inside its streaming helper is not counted twice
+def _count_error(function, error):
+    if getattr(error, "_holo_error_counted", False):
+        return
+    ERRORS.inc(function=function)
+    try:
+        error._holo_error_counted = True
+    except AttributeError:
+        pass
+
+def count_errors(function):
+    """
+    Decorator that counts calls of function that raise, for plain, generator and async functions alike.
+
+    An exception already counted by a decorated function it was raised from is not counted again.
+    """
+
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                except Exception as e:
+                    _count_error(function, e)
+                    raise
+        elif inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    _count_error(function, e)
+                    raise
+        elif inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                try:
+                    return (yield from func(*args, **kwargs))
+                except Exception as e:
+                    _count_error(function, e)
+                    raise
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    _count_error(function, e)
+                    raise
+        return wrapper
+
+    return decorator
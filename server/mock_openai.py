@@ -0,0 +1,405 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# A local stand-in for the OpenAI Assistants and Chat Completions endpoints.
+# Point the OpenAI client at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+# to benchmark or exercise the assistant module without network access.
+
+MOCK_PORT = int(os.getenv("MOCK_OPENAI_PORT", 8100))
+
+# Default behaviour of every run, changeable at runtime through POST /mock/config
+DEFAULT_CONFIG = {
+    # Seconds a run stays queued before it starts
+    "queue_delay": float(os.getenv("MOCK_OPENAI_QUEUE_DELAY", 0.2)),
+    # Seconds a run stays in_progress before it finishes or asks for tools
+    "model_delay": float(os.getenv("MOCK_OPENAI_MODEL_DELAY", 0.8)),
+    # Seconds between two streamed text deltas
+    "token_delay": float(os.getenv("MOCK_OPENAI_TOKEN_DELAY", 0.02)),
+    # Seconds every other request (threads, messages, files) takes
+    "request_delay": float(os.getenv("MOCK_OPENAI_REQUEST_DELAY", 0.02)),
+    # Tool calls a run requests once, e.g. [{"name": "get_weather", "arguments": {"city": "Paris"}}]
+    "tool_calls": json.loads(os.getenv("MOCK_OPENAI_TOOL_CALLS", "[]")),
+    # Probability that a run ends as failed instead of completed
+    "fail_rate": float(os.getenv("MOCK_OPENAI_FAIL_RATE", 0)),
+    # The reply every run and chat completion produces
+    "reply": os.getenv("MOCK_OPENAI_REPLY", "Hello! This is the mock assistant answering your message."),
+}
+
+config = dict(DEFAULT_CONFIG)
+
+# In-memory state, only touched from the event loop
+assistants = {}
+threads = {}
+messages = {}
+runs = {}
+request_counts = {}
+
+app = FastAPI()
+
+# Count requests per route for /mock/stats
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    route = f"{request.method} {request.url.path}"
+    for prefix, name in (("thread_", "{thread_id}"), ("run_", "{run_id}"), ("asst_", "{assistant_id}")):
+        route = "/".join(name if part.startswith(prefix) else part for part in route.split("/"))
+    request_counts[route] = request_counts.get(route, 0) + 1
+    return await call_next(request)
+
+def _new_id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+def _not_found(kind, object_id):
+    return JSONResponse(status_code=404, content={"error": {"message": f"No {kind} found with id '{object_id}'.", "type": "invalid_request_error"}})
+
+def _public(obj):
+    # Drop the bookkeeping fields that start with an underscore
+    return {key: value for key, value in obj.items() if not key.startswith("_")}
+
+def _text_content(text):
+    return [{"type": "text", "text": {"value": text, "annotations": []}}]
+
+def _tokens(text):
+    # Split the reply into word-sized deltas, keeping the spaces
+    words = text.split(" ")
+    return [word if i == len(words) - 1 else word + " " for i, word in enumerate(words)]
+
+def _create_message(thread_id, role, text, run_id=None, assistant_id=None, attachments=None):
+    message = {
+        "id": _new_id("msg"),
+        "object": "thread.message",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "role": role,
+        "content": _text_content(text),
+        "assistant_id": assistant_id,
+        "run_id": run_id,
+        "attachments": attachments or [],
+        "metadata": {},
+        "status": "completed",
+    }
+    messages[message["id"]] = message
+    threads[thread_id]["_messages"].append(message["id"])
+    return message
+
+def _required_action(run):
+    tool_calls = [
+        {
+            "id": _new_id("call"),
+            "type": "function",
+            "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+        }
+        for call in run["_tool_calls"]
+    ]
+    return {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": tool_calls}}
+
+def _fail(run):
+    run["status"] = "failed"
+    run["failed_at"] = int(time.time())
+    run["last_error"] = {"code": "server_error", "message": "Simulated failure from the mock server."}
+
+def _finish(run):
+    # End the run, failing it with the configured probability
+    if random.random() < run["_fail_rate"]:
+        _fail(run)
+    else:
+        _create_message(run["thread_id"], "assistant", run["_reply"], run_id=run["id"], assistant_id=run["assistant_id"])
+        run["status"] = "completed"
+        run["completed_at"] = int(time.time())
+
+def _advance(run):
+    """
+    Moves a polled run along queued -> in_progress -> requires_action/completed/failed by elapsed time.
+    """
+    if run["status"] not in ("queued", "in_progress"):
+        return run
+
+    elapsed = time.monotonic() - run["_phase_start"]
+    if elapsed < run["_queue_delay"]:
+        run["status"] = "queued"
+    elif elapsed < run["_queue_delay"] + run["_model_delay"]:
+        run["status"] = "in_progress"
+        run["started_at"] = run["started_at"] or int(time.time())
+    elif run["_tool_calls"] and not run["_tools_submitted"]:
+        run["status"] = "requires_action"
+        run["required_action"] = _required_action(run)
+    else:
+        _finish(run)
+    return run
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_run(run, queued=True):
+    """
+    Plays a run out as Assistants stream events, with the same delays as a polled run.
+    """
+    if queued:
+        yield _sse("thread.run.created", _public(run))
+        yield _sse("thread.run.queued", _public(run))
+        await asyncio.sleep(run["_queue_delay"])
+
+    run["status"] = "in_progress"
+    run["started_at"] = run["started_at"] or int(time.time())
+    yield _sse("thread.run.in_progress", _public(run))
+    await asyncio.sleep(run["_model_delay"])
+
+    if run["_tool_calls"] and not run["_tools_submitted"]:
+        run["status"] = "requires_action"
+        run["required_action"] = _required_action(run)
+        yield _sse("thread.run.requires_action", _public(run))
+        yield "event: done\ndata: [DONE]\n\n"
+        return
+
+    if random.random() < run["_fail_rate"]:
+        _fail(run)
+        yield _sse("thread.run.failed", _public(run))
+        yield "event: done\ndata: [DONE]\n\n"
+        return
+
+    message_id = _new_id("msg")
+    in_progress = {
+        "id": message_id, "object": "thread.message", "created_at": int(time.time()), "thread_id": run["thread_id"],
+        "role": "assistant", "content": [], "assistant_id": run["assistant_id"], "run_id": run["id"],
+        "attachments": [], "metadata": {}, "status": "in_progress",
+    }
+    yield _sse("thread.message.created", in_progress)
+    for token in _tokens(run["_reply"]):
+        delta = {"id": message_id, "object": "thread.message.delta",
+                 "delta": {"content": [{"index": 0, "type": "text", "text": {"value": token, "annotations": []}}]}}
+        yield _sse("thread.message.delta", delta)
+        await asyncio.sleep(run["_token_delay"])
+
+    message = _create_message(run["thread_id"], "assistant", run["_reply"], run_id=run["id"], assistant_id=run["assistant_id"])
+    yield _sse("thread.message.completed", message)
+    run["status"] = "completed"
+    run["completed_at"] = int(time.time())
+    yield _sse("thread.run.completed", _public(run))
+    yield "event: done\ndata: [DONE]\n\n"
+
+def _event_stream(generator):
+    return StreamingResponse(generator, media_type="text/event-stream")
+
+## MOCK CONTROL
+@app.get("/mock/config")
+async def get_config():
+    return config
+
+@app.post("/mock/config")
+async def set_config(request: Request):
+    # Unknown keys are ignored; {"reset": true} restores the defaults first
+    updates = await request.json()
+    if updates.pop("reset", False):
+        config.clear()
+        config.update(DEFAULT_CONFIG)
+    config.update({key: value for key, value in updates.items() if key in DEFAULT_CONFIG})
+    return config
+
+@app.get("/mock/stats")
+async def get_stats():
+    statuses = {}
+    for run in runs.values():
+        statuses[run["status"]] = statuses.get(run["status"], 0) + 1
+    return {"requests": request_counts, "runs": statuses, "threads": len(threads), "messages": len(messages)}
+
+## ASSISTANTS
+@app.post("/v1/assistants")
+async def create_assistant(request: Request):
+    body = await request.json()
+    await asyncio.sleep(config["request_delay"])
+    assistant = {
+        "id": _new_id("asst"),
+        "object": "assistant",
+        "created_at": int(time.time()),
+        "name": body.get("name"),
+        "description": body.get("description"),
+        "model": body.get("model", "gpt-4o"),
+        "instructions": body.get("instructions"),
+        "tools": body.get("tools", []),
+        "metadata": body.get("metadata", {}),
+    }
+    assistants[assistant["id"]] = assistant
+    return assistant
+
+@app.get("/v1/assistants/{assistant_id}")
+async def retrieve_assistant(assistant_id: str):
+    if assistant_id not in assistants:
+        return _not_found("assistant", assistant_id)
+    return assistants[assistant_id]
+
+@app.post("/v1/assistants/{assistant_id}")
+async def update_assistant(assistant_id: str, request: Request):
+    if assistant_id not in assistants:
+        return _not_found("assistant", assistant_id)
+    body = await request.json()
+    await asyncio.sleep(config["request_delay"])
+    assistants[assistant_id].update({key: value for key, value in body.items() if key in assistants[assistant_id]})
+    return assistants[assistant_id]
+
+## THREADS AND MESSAGES
+@app.post("/v1/threads")
+async def create_thread(request: Request):
+    await asyncio.sleep(config["request_delay"])
+    thread = {"id": _new_id("thread"), "object": "thread", "created_at": int(time.time()), "metadata": {}, "_messages": []}
+    threads[thread["id"]] = thread
+    return _public(thread)
+
+@app.get("/v1/threads/{thread_id}")
+async def retrieve_thread(thread_id: str):
+    if thread_id not in threads:
+        return _not_found("thread", thread_id)
+    return _public(threads[thread_id])
+
+@app.delete("/v1/threads/{thread_id}")
+async def delete_thread(thread_id: str):
+    if thread_id not in threads:
+        return _not_found("thread", thread_id)
+    await asyncio.sleep(config["request_delay"])
+    for message_id in threads.pop(thread_id)["_messages"]:
+        messages.pop(message_id, None)
+    return {"id": thread_id, "object": "thread.deleted", "deleted": True}
+
+@app.post("/v1/threads/{thread_id}/messages")
+async def create_message(thread_id: str, request: Request):
+    if thread_id not in threads:
+        return _not_found("thread", thread_id)
+    body = await request.json()
+    await asyncio.sleep(config["request_delay"])
+    content = body.get("content", "")
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return _create_message(thread_id, body.get("role", "user"), content, attachments=body.get("attachments"))
+
+@app.get("/v1/threads/{thread_id}/messages")
+async def list_messages(thread_id: str, run_id: str = None, order: str = "desc", limit: int = 20, after: str = None):
+    if thread_id not in threads:
+        return _not_found("thread", thread_id)
+    await asyncio.sleep(config["request_delay"])
+    ids = threads[thread_id]["_messages"]
+    data = [messages[message_id] for message_id in (reversed(ids) if order == "desc" else ids)]
+    if run_id:
+        data = [message for message in data if message["run_id"] == run_id]
+    if after:
+        position = next((i for i, message in enumerate(data) if message["id"] == after), -1)
+        data = data[position + 1:]
+    page = data[:limit]
+    return {
+        "object": "list",
+        "data": page,
+        "first_id": page[0]["id"] if page else None,
+        "last_id": page[-1]["id"] if page else None,
+        "has_more": len(data) > limit,
+    }
+
+## RUNS
+@app.post("/v1/threads/{thread_id}/runs")
+async def create_run(thread_id: str, request: Request):
+    if thread_id not in threads:
+        return _not_found("thread", thread_id)
+    body = await request.json()
+    run = {
+        "id": _new_id("run"),
+        "object": "thread.run",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "assistant_id": body.get("assistant_id"),
+        "status": "queued",
+        "required_action": None,
+        "last_error": None,
+        "started_at": None,
+        "completed_at": None,
+        "failed_at": None,
+        "model": body.get("model", "gpt-4o"),
+        "instructions": body.get("instructions", ""),
+        "tools": body.get("tools", []),
+        "metadata": {},
+        # Snapshot the config so a change mid-run does not affect it
+        "_phase_start": time.monotonic(),
+        "_queue_delay": config["queue_delay"],
+        "_model_delay": config["model_delay"],
+        "_token_delay": config["token_delay"],
+        "_tool_calls": list(config["tool_calls"]),
+        "_fail_rate": config["fail_rate"],
+        "_reply": config["reply"],
+        "_tools_submitted": False,
+    }
+    runs[run["id"]] = run
+
+    if body.get("stream"):
+        return _event_stream(_stream_run(run))
+    return _public(run)
+
+@app.get("/v1/threads/{thread_id}/runs")
+async def list_runs(thread_id: str, limit: int = 20):
+    data = [_public(_advance(run)) for run in reversed(list(runs.values())) if run["thread_id"] == thread_id][:limit]
+    return {"object": "list", "data": data, "first_id": data[0]["id"] if data else None,
+            "last_id": data[-1]["id"] if data else None, "has_more": False}
+
+@app.get("/v1/threads/{thread_id}/runs/{run_id}")
+async def retrieve_run(thread_id: str, run_id: str):
+    run = runs.get(run_id)
+    if run is None or run["thread_id"] != thread_id:
+        return _not_found("run", run_id)
+    return _public(_advance(run))
+
+@app.post("/v1/threads/{thread_id}/runs/{run_id}/submit_tool_outputs")
+async def submit_tool_outputs(thread_id: str, run_id: str, request: Request):
+    run = runs.get(run_id)
+    if run is None or run["thread_id"] != thread_id:
+        return _not_found("run", run_id)
+    if run["status"] != "requires_action":
+        return JSONResponse(status_code=400, content={"error": {"message": f"Run is {run['status']}, not requires_action.", "type": "invalid_request_error"}})
+
+    body = await request.json()
+    expected = {call["id"] for call in run["required_action"]["submit_tool_outputs"]["tool_calls"]}
+    submitted = {output.get("tool_call_id") for output in body.get("tool_outputs", [])}
+    if submitted != expected:
+        return JSONResponse(status_code=400, content={"error": {"message": f"Expected outputs for {sorted(expected)}, got {sorted(submitted)}.", "type": "invalid_request_error"}})
+
+    # The model phase starts again, without the queue
+    run["_tool_outputs"] = body["tool_outputs"]
+    run["_tools_submitted"] = True
+    run["_queue_delay"] = 0
+    run["_phase_start"] = time.monotonic()
+    run["required_action"] = None
+    run["status"] = "in_progress"
+
+    if body.get("stream"):
+        return _event_stream(_stream_run(run, queued=False))
+    return _public(run)
+
+## FILES
+@app.post("/v1/files")
+async def create_file(request: Request):
+    # The upload is read but not parsed; only its size is recorded
+    body = await request.body()
+    await asyncio.sleep(config["request_delay"])
+    return {"id": _new_id("file"), "object": "file", "bytes": len(body), "created_at": int(time.time()),
+            "filename": "upload", "purpose": "user_data", "status": "processed"}
+
+## CHAT COMPLETIONS
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(config["model_delay"])
+    if random.random() < config["fail_rate"]:
+        return JSONResponse(status_code=500, content={"error": {"message": "Simulated failure from the mock server.", "type": "server_error"}})
+    return {
+        "id": _new_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": config["reply"]}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(_tokens(config["reply"])), "total_tokens": len(_tokens(config["reply"]))},
+    }
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else MOCK_PORT
+    uvicorn.run(app, port=port)
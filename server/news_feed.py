@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import OrderedDict
+import http_client
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+# Article URLs remembered per topic; the oldest are forgotten first
+MAX_SEEN_PER_TOPIC = 200
+
+# Extra articles requested on top of the ones wanted, to make up for ones already seen
+SEEN_SLACK = 5
+
+def fetch_articles(topic, page_size, since=None):
+    """
+    Requests only the newest page_size articles on a topic, newest first.
+
+    Args:
+        topic (str): The search query.
+        page_size (int): The number of articles to download (newsapi.org allows up to 100).
+        since (str, optional): Only return articles published at or after this ISO 8601 time. Defaults to None.
+
+    Returns:
+        list: The articles as dicts with title, description, url and publishedAt, or None if the request failed.
+    """
+    params = {"q": topic, "pageSize": page_size, "sortBy": "publishedAt", "apiKey": NEWS_API_KEY}
+    if since:
+        params["from"] = since
+    try:
+        response = http_client.get(NEWS_API_URL, params=params)
+    except Exception as e:
+        print(f"Error getting news: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"Error getting news: Status code {response.status_code}")
+        return None
+    return [
+        {
+            "title": article.get("title"),
+            "description": article.get("description"),
+            "url": article.get("url"),
+            "publishedAt": article.get("publishedAt"),
+        }
+        for article in response.json().get("articles", [])
+    ]
+
+def format_articles(articles, max_length=None):
+    """
+    Yields one announcement paragraph per article, so callers can start on the first before the rest are formatted.
+
+    Args:
+        articles (iterable): Articles as returned by fetch_articles.
+        max_length (int, optional): Cut each paragraph to this many characters. Defaults to None (no limit).
+    """
+    for article in articles:
+        text = f"{article['title']}\n{article['description'] or ''}\nRead more: {article['url']}"
+        yield text[:max_length] if max_length else text
+
+class SeenArticles:
+    """
+    The article URLs already handed out per topic, and the newest publish time seen.
+
+    The publish time lets the next fetch ask newsapi.org only for articles
+    since then, and the URLs drop the ones on that boundary that were already
+    announced.
+    """
+
+    def __init__(self, max_per_topic=MAX_SEEN_PER_TOPIC):
+        self.max_per_topic = max_per_topic
+        self._urls = {}
+        self._newest = {}
+        self._lock = threading.Lock()
+
+    def newest(self, topic):
+        with self._lock:
+            return self._newest.get(topic)
+
+    def filter_new(self, topic, articles):
+        """Returns the articles whose URL has not been seen for this topic, without marking them."""
+        with self._lock:
+            seen = self._urls.get(topic, {})
+            return [article for article in articles if article["url"] not in seen]
+
+    def mark(self, topic, articles):
+        with self._lock:
+            seen = self._urls.setdefault(topic, OrderedDict())
+            for article in articles:
+                seen[article["url"]] = True
+                seen.move_to_end(article["url"])
+                published = article.get("publishedAt")
+                if published and published > self._newest.get(topic, ""):
+                    self._newest[topic] = published
+            while len(seen) > self.max_per_topic:
+                seen.popitem(last=False)
+
+    def clear(self, topic=None):
+        with self._lock:
+            if topic is None:
+                self._urls.clear()
+                self._newest.clear()
+            else:
+                self._urls.pop(topic, None)
+                self._newest.pop(topic, None)
+
+# Shared by every announcer in the process
+seen_articles = SeenArticles()
+
+def take_new(topic, articles, limit):
+    """
+    Returns up to limit of articles not seen before for the topic, and marks them as seen.
+    """
+    new_articles = seen_articles.filter_new(topic, articles)[:limit]
+    seen_articles.mark(topic, new_articles)
+    return new_articles
+
+def fetch_unseen(topic, limit):
+    """
+    Downloads the newest articles on a topic that may not have been seen yet, without marking any.
+
+    After the first announcement of a topic, only articles published since the
+    newest one seen are requested.
+
+    Returns:
+        list: The articles, or None if the request failed.
+    """
+    since = seen_articles.newest(topic)
+    return fetch_articles(topic, limit + SEEN_SLACK if since else limit, since=since)
+
+def get_new_articles(topic, limit):
+    """
+    Returns up to limit articles on a topic that have not been returned before, and marks them as seen.
+
+    Args:
+        topic (str): The search query.
+        limit (int): The maximum number of articles.
+
+    Returns:
+        list: The new articles, newest first (empty if there are none), or None if the request failed.
+    """
+    articles = fetch_unseen(topic, limit)
+    if articles is None:
+        return None
+    return take_new(topic, articles, limit)
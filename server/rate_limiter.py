@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import inspect
+import functools
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from metrics import OUTBOUND_WAIT, RATE_LIMITED
+
+# Priority classes, most urgent first. Interactive is the chat the user is
+# waiting on, normal is a one-off the user asked for (an email suggestion, a
+# free calendar slot), background is anything the user did not ask for right
+# now (OCR feedback, goal reports).
+PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+DEFAULT_PRIORITY = "normal"
+
+# Account limits; the defaults are the lowest paid tier for gpt-4o
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500))
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 30000))
+
+# Share of both buckets that background requests may not use, kept for interactive ones
+BACKGROUND_RESERVE = 0.2
+
+# Token estimate for a run, which reads the whole thread and writes a reply
+RUN_TOKEN_ESTIMATE = 2000
+
+# Token estimate for one image in a chat completion
+IMAGE_TOKEN_ESTIMATE = 1000
+
+# Backoff after a 429 without a Retry-After header: 1s, 2s, 4s... up to MAX_BACKOFF
+MAX_BACKOFF = 60
+
+_current_priority = contextvars.ContextVar("request_priority", default=DEFAULT_PRIORITY)
+
+class TokenBucket:
+    """Holds up to capacity tokens and refills at rate tokens per second. Not thread-safe on its own."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, reserve=0):
+        """Returns the seconds until amount tokens are available on top of reserve, 0 if they are now."""
+        self._refill()
+        # A request larger than the bucket could never run, so it only waits for a full bucket
+        needed = min(amount + reserve, self.capacity)
+        if self.tokens >= needed:
+            return 0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= amount
+
+    def limit(self, remaining):
+        # Trust the server when it reports fewer tokens left than we think we have
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+
+class OutboundScheduler:
+    """
+    Admits outbound model requests in priority order under request and token budgets.
+
+    Every request takes a ticket; only the most urgent, oldest ticket may
+    draw from the buckets, so a burst of background work cannot get ahead of
+    a chat message queued after it. A 429 pauses everyone until the server's
+    Retry-After (or an exponential backoff) has passed.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE, background_reserve=BACKGROUND_RESERVE):
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.background_reserve = background_reserve
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._paused_until = 0
+        self._consecutive_429 = 0
+        self._granted = {name: 0 for name in PRIORITIES}
+        self._rate_limited = 0
+
+    def _enqueue(self, priority):
+        ticket = (PRIORITIES[priority], next(self._sequence))
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _try_take(self, ticket, priority, tokens):
+        """Returns 0 and takes the budget if ticket may go now, otherwise the seconds worth waiting."""
+        if self._waiting[0] != ticket:
+            return None
+        wait = self._paused_until - time.monotonic()
+        reserve = self.background_reserve if priority == "background" else 0
+        wait = max(wait,
+                   self.requests.wait_time(1, reserve * self.requests.capacity),
+                   self.tokens.wait_time(tokens, reserve * self.tokens.capacity))
+        if wait > 0:
+            return wait
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        heapq.heappop(self._waiting)
+        self._granted[priority] += 1
+        self._condition.notify_all()
+        return 0
+
+    def _cancel(self, ticket):
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            self._condition.notify_all()
+
+    def acquire(self, priority=DEFAULT_PRIORITY, tokens=0):
+        """
+        Blocks until a request of the given priority and token estimate may be sent.
+
+        Args:
+            priority (str, optional): One of PRIORITIES. Defaults to DEFAULT_PRIORITY.
+            tokens (int, optional): The estimated tokens the request uses. Defaults to 0.
+
+        Returns:
+            float: The seconds spent waiting.
+        """
+        start = time.perf_counter()
+        with self._condition:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._try_take(ticket, priority, tokens)
+                    if wait == 0:
+                        break
+                    # Not at the head: wake up when the head changes; at the head: when budget refills
+                    self._condition.wait(wait)
+            except BaseException:
+                self._cancel(ticket)
+                raise
+        waited = time.perf_counter() - start
+        OUTBOUND_WAIT.observe(waited, priority=priority)
+        return waited
+
+    async def aacquire(self, priority=DEFAULT_PRIORITY, tokens=0):
+        """Same as acquire, but sleeps on the event loop instead of blocking it."""
+        start = time.perf_counter()
+        with self._condition:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_take(ticket, priority, tokens)
+                if wait == 0:
+                    break
+                # Async waiters cannot wait on the condition, so they poll the head of the queue
+                await asyncio.sleep(min(wait, 0.05) if wait else 0.01)
+        except BaseException:
+            with self._condition:
+                self._cancel(ticket)
+            raise
+        waited = time.perf_counter() - start
+        OUTBOUND_WAIT.observe(waited, priority=priority)
+        return waited
+
+    def record_response(self, status_code, headers):
+        """
+        Updates the budgets from a response: honours x-ratelimit-remaining-* and pauses on a 429.
+        """
+        with self._condition:
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_requests is not None and remaining_requests.isdigit():
+                self.requests.limit(int(remaining_requests))
+            if remaining_tokens is not None and remaining_tokens.isdigit():
+                self.tokens.limit(int(remaining_tokens))
+
+            if status_code != 429:
+                self._consecutive_429 = 0
+                return
+
+            self._consecutive_429 += 1
+            self._rate_limited += 1
+            RATE_LIMITED.inc(priority=current_priority())
+            try:
+                delay = float(headers.get("retry-after"))
+            except (TypeError, ValueError):
+                delay = min(MAX_BACKOFF, 2 ** (self._consecutive_429 - 1))
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            self.requests._refill()
+            self.tokens._refill()
+            waiting = {name: 0 for name in PRIORITIES}
+            names = {value: name for name, value in PRIORITIES.items()}
+            for priority, _ in self._waiting:
+                waiting[names[priority]] += 1
+            return {
+                "requests_available": round(self.requests.tokens, 1),
+                "tokens_available": round(self.tokens.tokens),
+                "waiting": waiting,
+                "granted": dict(self._granted),
+                "rate_limited": self._rate_limited,
+                "paused_for": round(max(0, self._paused_until - time.monotonic()), 2),
+            }
+
+# Shared by every OpenAI client and direct API call of the process
+scheduler = OutboundScheduler()
+
+def current_priority():
+    return _current_priority.get()
+
+@contextmanager
+def request_priority(priority):
+    """Sends the OpenAI requests made inside the with-block at the given priority."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}")
+    previous = _current_priority.get()
+    _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.set(previous)
+
+def prioritized(func):
+    """
+    Decorator that sends the OpenAI requests of func at the priority passed as its priority argument.
+    """
+
+    signature = inspect.signature(func)
+
+    def priority_of(args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound.arguments["priority"]
+
+    # Generators get the priority around each step only, so it does not leak
+    # into the consumer's code between items
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            priority = priority_of(args, kwargs)
+            generator = func(*args, **kwargs)
+
+            async def step(awaitable):
+                with request_priority(priority):
+                    return await awaitable
+
+            try:
+                item = await step(generator.asend(None))
+                while True:
+                    try:
+                        sent = yield item
+                    except GeneratorExit:
+                        await step(generator.aclose())
+                        raise
+                    except BaseException as e:
+                        item = await step(generator.athrow(e))
+                    else:
+                        item = await step(generator.asend(sent))
+            except StopAsyncIteration:
+                return
+    elif inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with request_priority(priority_of(args, kwargs)):
+                return await func(*args, **kwargs)
+    elif inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            priority = priority_of(args, kwargs)
+            generator = func(*args, **kwargs)
+
+            def step(method, *step_args):
+                with request_priority(priority):
+                    return method(*step_args)
+
+            try:
+                item = step(generator.send, None)
+                while True:
+                    try:
+                        sent = yield item
+                    except GeneratorExit:
+                        step(generator.close)
+                        raise
+                    except BaseException as e:
+                        item = step(generator.throw, e)
+                    else:
+                        item = step(generator.send, sent)
+            except StopIteration as stop:
+                return stop.value
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with request_priority(priority_of(args, kwargs)):
+                return func(*args, **kwargs)
+    return wrapper
+
+def estimate_tokens(method, path, body=b""):
+    """
+    Roughly estimates the tokens an OpenAI request uses, from its path and JSON body.
+
+    Only runs and chat completions use the model; everything else (messages,
+    polling, files) only counts against the request budget.
+    """
+    if method != "POST":
+        return 0
+    if path.endswith("/runs") or path.endswith("/submit_tool_outputs"):
+        return RUN_TOKEN_ESTIMATE
+    if path.endswith("/chat/completions"):
+        try:
+            payload = json.loads(body)
+        except (TypeError, ValueError):
+            return RUN_TOKEN_ESTIMATE
+        return estimate_chat_tokens(payload)
+    return 0
+
+def estimate_chat_tokens(payload):
+    """Roughly estimates the tokens of a chat completions payload, images and reply included."""
+    prompt_chars, images = 0, 0
+    for message in payload.get("messages", []):
+        content = message.get("content") or ""
+        if isinstance(content, str):
+            prompt_chars += len(content)
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                images += 1
+            else:
+                prompt_chars += len(part.get("text", ""))
+    # About four characters per token, a flat estimate per image, plus the longest reply
+    return prompt_chars // 4 + images * IMAGE_TOKEN_ESTIMATE + payload.get("max_tokens", 1000)
+
+# httpx event hooks for the OpenAI clients
+def _request_tokens(request):
+    # File uploads are streamed, so only chat completion bodies are read
+    body = request.content if request.url.path.endswith("/chat/completions") else b""
+    return estimate_tokens(request.method, request.url.path, body)
+
+def _request_hook(request):
+    scheduler.acquire(current_priority(), _request_tokens(request))
+
+def _response_hook(response):
+    scheduler.record_response(response.status_code, response.headers)
+
+async def _arequest_hook(request):
+    await scheduler.aacquire(current_priority(), _request_tokens(request))
+
+async def _aresponse_hook(response):
+    scheduler.record_response(response.status_code, response.headers)
+
+def event_hooks():
+    return {"request": [_request_hook], "response": [_response_hook]}
+
+def async_event_hooks():
+    return {"request": [_arequest_hook], "response": [_aresponse_hook]}
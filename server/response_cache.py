@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+
+# SQLite file holding cached replies, relative to the working directory
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "response_cache.db")
+
+# Default lifetime of a cached reply (seconds) and the maximum number of replies kept
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+RESPONSE_CACHE_MAX_ENTRIES = 500
+
+class ResponseCache:
+    """
+    A persistent prompt -> reply cache stored in SQLite.
+
+    Entries expire after their TTL, and the least recently used entries are
+    evicted once max_entries is exceeded. A new connection is opened for each
+    operation, so the cache can be used from any thread.
+    """
+
+    def __init__(self, db_path=RESPONSE_CACHE_DB, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.initialize_db()
+
+    def initialize_db(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            c = conn.cursor()
+            c.execute('''CREATE TABLE IF NOT EXISTS responses
+                         (key TEXT PRIMARY KEY, response TEXT, expires_at REAL, last_used REAL)''')
+            c.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Error initializing response cache: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def make_key(prompt, assistant_id=None):
+        """Hashes everything that determines the reply into a cache key."""
+        payload = json.dumps([prompt, assistant_id], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached reply for key, or None if it is missing or expired.
+        """
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            c = conn.cursor()
+            now = time.time()
+            c.execute("SELECT response, expires_at FROM responses WHERE key = ?", (key,))
+            row = c.fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    c.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+            c.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+        except Exception as e:
+            logging.error(f"Error reading response cache: {e}")
+            self.misses += 1
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def set(self, key, response, ttl=RESPONSE_CACHE_TTL):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            c = conn.cursor()
+            now = time.time()
+            c.execute("INSERT OR REPLACE INTO responses (key, response, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                      (key, json.dumps(response, ensure_ascii=False), now + ttl, now))
+            c.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            c.execute('''DELETE FROM responses WHERE key IN
+                         (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)''', (self.max_entries,))
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Error writing response cache: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def clear(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Error clearing response cache: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "max_entries": self.max_entries}
+
+_response_cache = None
+
+# Created on first use, so processes that never opt in do not create the database
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -1,14 +1,25 @@
+import json
+import time
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from instructions import holo_instructions
 # from functions import get_city_for_date, get_qa
-from assistant import create_assistant, create_thread, get_completion
-from utils import get_current_location, get_weather, get_news_updates
+from assistant import create_assistant, thread_pool
+from async_assistant import acreate_thread, aget_completion, astream_completion, astream_events
+from utils import get_cache_stats
+from tools import tool_registry
+from run_queue import run_queue
+from http_client import connection_stats
+from metrics import render_metrics
+from rate_limiter import scheduler
+from conversation_store import get_conversation_store, DEFAULT_PAGE_SIZE
 
-# List of functions
-funcs = [get_current_location, get_weather, get_news_updates]
+# Tools the assistant may call
+funcs = tool_registry
 # Create FastAPI app
 app = FastAPI()
 
@@ -25,6 +36,7 @@ app.add_middleware(
 class ChatMessage(BaseModel):
     user_input: str
     thread_id: str
+    stream: bool = False
 
 DEBUG = True
 
@@ -40,78 +52,118 @@ assistant_id = create_assistant(
     {
         "type": "code_interpreter"  
     },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_current_location",
-            "description": "Get the current geographical location of the user based on IP address.",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_weather",
-            "description": "Get the current weather for the specified location. The assistant will give advice based on the weather and it will also advice the users weather is suitable to go out or not.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    # "city": {
-                    #     "type": "string",
-                    #     "description": "The city for which to get the weather."
-                    # }
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_news_updates",
-            "description": "Get the latest news updates on a given topic in a short summary. The assistant will reply in a short sentence",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "topic": {
-                        "type": "string",
-                        "description": "The topic for which to get the news updates."
-                    }
-                },
-                "required": ["topic"]
-            }
-        }
-    },
-],
+    ] + tool_registry.schemas(),
     #files=["./files/holo.jpg"]
 )
 
+# Pre-create threads so the first /create_thread is served instantly
+thread_pool.warm()
+
 ## TEST ROOT
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Holo Assistant API!"}
 
+@app.get("/tool_cache")
+async def tool_cache_endpoint():
+    # Hit/miss counters of the cached tools
+    return get_cache_stats()
+
+@app.get("/run_queue")
+async def run_queue_endpoint():
+    # Queue depth and wait time of runs serialized per thread
+    return run_queue.stats()
+
+@app.get("/http_stats")
+async def http_stats_endpoint():
+    # Connection reuse of the shared HTTP session
+    return connection_stats()
+
+@app.get("/rate_limits")
+async def rate_limits_endpoint():
+    # Remaining budget and waiting requests per priority of the OpenAI rate limiter
+    return scheduler.stats()
+
+@app.get("/thread_pool")
+async def thread_pool_endpoint():
+    # Warm threads ready, and calls served from the pool versus created on demand
+    return thread_pool.stats()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Phase latencies and run/tool/error counters in Prometheus text format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/create_thread")
 async def create_thread_endpoint():
     # Create Thread
-    thread_id = create_thread(debug=DEBUG)
+    thread_id = await acreate_thread(debug=DEBUG)
     return {"thread_id": thread_id}
 
 @app.post("/chat")
 async def chat_endpoint(request: ChatMessage):
+    # Stream partial text while the reply is generated
+    if request.stream:
+        return StreamingResponse(
+            text_stream(request.user_input, request.thread_id, debug=DEBUG),
+            media_type="text/plain"
+        )
+
     # Get response
-    message = main(request.user_input, request.thread_id, debug=DEBUG)
+    message = await main(request.user_input, request.thread_id, debug=DEBUG)
     return {
         "message": message
     }
 
-def main(query, thread_id, debug=False):
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatMessage):
+    # Forward run events to the client as Server-Sent Events
+    return StreamingResponse(
+        sse_events(request.user_input, request.thread_id, debug=DEBUG),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def text_stream(query, thread_id, debug=False):
+    # The plain text body has no event framing, so a failed run ends it with an error line
+    try:
+        async for delta in astream_completion(assistant_id, thread_id, query, funcs, debug=debug, priority="interactive"):
+            yield delta
+    except Exception as e:
+        yield f"\n[error] {e}\n"
+
+async def sse_events(query, thread_id, debug=False):
+    start = time.perf_counter()
+    first_token = None
+    try:
+        async for event in astream_events(assistant_id, thread_id, query, funcs, debug, priority="interactive"):
+            if event["type"] == "delta" and first_token is None:
+                first_token = time.perf_counter() - start
+            if event["type"] == "done":
+                event["time_to_first_token"] = first_token
+                event["total_time"] = time.perf_counter() - start
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+
+@app.get("/threads")
+async def threads_endpoint(limit: int = DEFAULT_PAGE_SIZE, offset: int = 0):
+    # Threads with locally stored history, most recent first
+    return await asyncio.to_thread(get_conversation_store().list_threads, limit, offset)
+
+@app.get("/threads/{thread_id}/messages")
+async def thread_messages_endpoint(thread_id: str, limit: int = DEFAULT_PAGE_SIZE, before: int = None):
+    # One page of a thread's history from the local store; pass "before" from the response for the next older page
+    return await asyncio.to_thread(get_conversation_store().get_messages, thread_id, limit, before)
+
+@app.get("/search")
+async def search_endpoint(q: str, thread_id: str = None, limit: int = 20):
+    # Full-text search over the locally stored history
+    return await asyncio.to_thread(get_conversation_store().search, q, thread_id, limit)
+
+async def main(query, thread_id, debug=False):
     # Functions
-    message = get_completion(assistant_id, thread_id, query, funcs, debug)
+    message = await aget_completion(assistant_id, thread_id, query, funcs, debug, priority="interactive")
     return message
 
 
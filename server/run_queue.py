@@ -0,0 +1,193 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+class _Waiter:
+    """A caller queued for a _FifoLock. wake() is called once the lock has been handed to it."""
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+def _wake_future(future):
+    if not future.done():
+        future.set_result(None)
+
+class _FifoLock:
+    """
+    A lock that is handed to waiters in the order they arrived.
+
+    Blocking callers (acquire) and asyncio callers (aacquire) queue on the same
+    lock, so a run started from a worker thread and one started from the event
+    loop still take turns. A waiter that gives up, e.g. a cancelled task, leaves
+    the queue, and passes the lock on if it was handed over in the meantime.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locked = False
+        self._waiters = deque()
+
+    def _try_acquire(self):
+        # Caller holds the mutex
+        if not self._locked and not self._waiters:
+            self._locked = True
+            return True
+        return False
+
+    def _abandon(self, waiter):
+        with self._mutex:
+            if waiter.granted:
+                self._hand_over()
+            else:
+                self._waiters.remove(waiter)
+
+    def _hand_over(self):
+        # Caller holds the mutex and the lock
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            try:
+                waiter.wake()
+                return
+            except RuntimeError:
+                # Its event loop has closed, so nobody is waiting any more
+                continue
+        self._locked = False
+
+    def acquire(self):
+        with self._mutex:
+            if self._try_acquire():
+                return
+            event = threading.Event()
+            waiter = _Waiter(event.set)
+            self._waiters.append(waiter)
+        try:
+            event.wait()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._mutex:
+            if self._try_acquire():
+                return
+            future = loop.create_future()
+            waiter = _Waiter(lambda: loop.call_soon_threadsafe(_wake_future, future))
+            self._waiters.append(waiter)
+        try:
+            await future
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(self):
+        with self._mutex:
+            self._hand_over()
+
+class ThreadRunQueue:
+    """
+    Serializes runs per assistant thread.
+
+    OpenAI rejects a new run while another run on the same thread is active,
+    so requests for one thread wait their turn in arrival order, while
+    requests for different threads run in parallel. Blocking callers
+    (acquire) and asyncio callers (aacquire) share one queue per thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._depth = {}
+        self.runs = 0
+        self.waited_runs = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_depth = 0
+
+    def _enter(self, thread_id):
+        with self._lock:
+            depth = self._depth.get(thread_id, 0) + 1
+            self._depth[thread_id] = depth
+            self.max_depth = max(self.max_depth, depth)
+            lock = self._locks.get(thread_id)
+            if lock is None:
+                lock = self._locks[thread_id] = _FifoLock()
+            return lock
+
+    def _started(self, wait):
+        with self._lock:
+            self.runs += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if wait > 0.001:
+                self.waited_runs += 1
+
+    def _exit(self, thread_id):
+        with self._lock:
+            depth = self._depth[thread_id] - 1
+            if depth:
+                self._depth[thread_id] = depth
+            else:
+                # Nobody holds or waits for this thread's lock any more
+                del self._depth[thread_id]
+                del self._locks[thread_id]
+
+    @contextmanager
+    def acquire(self, thread_id):
+        """Blocks until it is this caller's turn to run on thread_id."""
+        lock = self._enter(thread_id)
+        start = time.perf_counter()
+        try:
+            lock.acquire()
+        except BaseException:
+            self._exit(thread_id)
+            raise
+        self._started(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            lock.release()
+            self._exit(thread_id)
+
+    @asynccontextmanager
+    async def aacquire(self, thread_id):
+        """Waits, without blocking the event loop, until it is this caller's turn to run on thread_id."""
+        lock = self._enter(thread_id)
+        start = time.perf_counter()
+        try:
+            await lock.aacquire()
+        except BaseException:
+            self._exit(thread_id)
+            raise
+        self._started(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            lock.release()
+            self._exit(thread_id)
+
+    def depth(self, thread_id):
+        """Returns the number of requests running or waiting on thread_id."""
+        with self._lock:
+            return self._depth.get(thread_id, 0)
+
+    def stats(self):
+        with self._lock:
+            running = len(self._depth)
+            queued = sum(self._depth.values()) - running
+            return {
+                "active_threads": running,
+                "queued_requests": queued,
+                "max_queue_depth": self.max_depth,
+                "runs": self.runs,
+                "waited_runs": self.waited_runs,
+                "avg_wait_seconds": self.total_wait / self.runs if self.runs else 0.0,
+                "max_wait_seconds": self.max_wait,
+            }
+
+# Shared by every assistant call in this process
+run_queue = ThreadRunQueue()
@@ -0,0 +1,126 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from metrics import THREAD_POOL_REQUESTS
+from rate_limiter import request_priority
+
+# Unused threads kept ready for create_thread once the pool is warmed; 0 turns the pool off
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", 2))
+
+# Seconds a pooled thread may wait before it is deleted and replaced
+THREAD_POOL_MAX_AGE = float(os.getenv("THREAD_POOL_MAX_AGE", 3600))
+
+# Seconds to wait before refilling again after thread creation failed
+REFILL_RETRY_DELAY = 30
+
+class WarmThreadPool:
+    """
+    A few pre-created, unused OpenAI threads, so a new conversation starts without a round trip.
+
+    A daemon worker tops the pool up whenever a thread is taken and replaces
+    threads older than max_age. Nothing is created until warm() is called,
+    which only the server does: a process that never warms the pool, like the
+    desktop app, creates its threads on demand and keeps no spare ones alive.
+    The worker's requests go out at background priority.
+    """
+
+    def __init__(self, create, delete=None, size=THREAD_POOL_SIZE, max_age=THREAD_POOL_MAX_AGE):
+        self.create = create
+        self.delete = delete
+        self.size = size
+        self.max_age = max_age
+        self._threads = deque()
+        self._to_delete = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        self._expired = 0
+
+    def take(self):
+        """
+        Returns a pooled thread ID at once, or None if the pool is empty, and schedules a refill if the pool is warm.
+        """
+        with self._lock:
+            # Expired threads are deleted by the worker, so the caller never waits on a request
+            self._to_delete.extend(self._pop_expired())
+            thread_id = self._threads.popleft()[0] if self._threads else None
+            warm = self._worker is not None
+        THREAD_POOL_REQUESTS.inc(source="pool" if thread_id else "on_demand")
+        if warm:
+            self._wake.set()
+        return thread_id
+
+    def get(self):
+        """Returns a pooled thread ID, creating a thread on demand if none is ready."""
+        thread_id = self.take()
+        if thread_id is None:
+            thread_id = self.create()
+        return thread_id
+
+    def warm(self):
+        """Starts filling the pool in the background."""
+        if self.size <= 0:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="thread-pool", daemon=True)
+                self._worker.start()
+        self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            ready = len(self._threads)
+        return {
+            "size": self.size,
+            "ready": ready,
+            "max_age": self.max_age,
+            "served_from_pool": THREAD_POOL_REQUESTS.value(source="pool"),
+            "created_on_demand": THREAD_POOL_REQUESTS.value(source="on_demand"),
+            "expired": self._expired,
+        }
+
+    def _pop_expired(self):
+        # Caller holds the lock; threads are ordered oldest first
+        expired = []
+        now = time.monotonic()
+        while self._threads and now - self._threads[0][1] > self.max_age:
+            expired.append(self._threads.popleft()[0])
+        self._expired += len(expired)
+        return expired
+
+    def _delete(self, thread_ids):
+        if not self.delete:
+            return
+        for thread_id in thread_ids:
+            try:
+                with request_priority("background"):
+                    self.delete(thread_id)
+            except Exception as e:
+                logging.warning(f"Could not delete expired thread {thread_id}: {e}")
+
+    def _run(self):
+        while True:
+            # Also wake up on our own to replace threads that have grown too old
+            self._wake.wait(timeout=self.max_age)
+            self._wake.clear()
+
+            with self._lock:
+                self._to_delete.extend(self._pop_expired())
+                expired = list(self._to_delete)
+                self._to_delete.clear()
+                missing = self.size - len(self._threads)
+            self._delete(expired)
+
+            for _ in range(missing):
+                try:
+                    with request_priority("background"):
+                        thread_id = self.create()
+                except Exception as e:
+                    logging.warning(f"Could not pre-create a thread: {e}")
+                    time.sleep(REFILL_RETRY_DELAY)
+                    self._wake.set()
+                    break
+                with self._lock:
+                    self._threads.append((thread_id, time.monotonic()))
@@ -0,0 +1,250 @@
+import json
+from utils import get_current_location, get_weather, get_weather_batch, get_news_updates
+
+class ToolError(Exception):
+    """Raised when a tool call names an unknown tool or has invalid arguments."""
+
+# JSON schema type name -> Python types accepted for it
+JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+    "null": (type(None),),
+}
+
+def compile_schema(schema, path="arguments"):
+    """
+    Compiles a JSON schema into a validator function.
+
+    Only the subset used by function-calling schemas is supported: type,
+    properties, required, additionalProperties, items and enum. The schema is
+    walked once here, so validating a call is a few dictionary lookups.
+
+    Args:
+        schema (dict): The JSON schema.
+        path (str, optional): The name used for the value in error messages.
+
+    Returns:
+        callable: A function that raises ToolError if a value does not match the schema.
+    """
+
+    checks = []
+
+    expected_type = schema.get("type")
+    if expected_type is not None:
+        type_names = expected_type if isinstance(expected_type, list) else [expected_type]
+        allowed = tuple(t for name in type_names for t in JSON_TYPES[name])
+        reject_bool = "boolean" not in type_names
+
+        def check_type(value):
+            # bool is a subclass of int, but JSON keeps them apart
+            if not isinstance(value, allowed) or (reject_bool and isinstance(value, bool)):
+                raise ToolError(f"{path} must be of type {expected_type}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        choices = schema["enum"]
+
+        def check_enum(value):
+            if value not in choices:
+                raise ToolError(f"{path} must be one of {choices}")
+        checks.append(check_enum)
+
+    properties = {
+        name: compile_schema(prop, f"{path}.{name}")
+        for name, prop in schema.get("properties", {}).items()
+    }
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", False)
+    if properties or required or expected_type == "object":
+
+        def check_object(value):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    raise ToolError(f"{path}.{name} is required")
+            for name, item in value.items():
+                validate = properties.get(name)
+                if validate is not None:
+                    validate(item)
+                elif additional is False:
+                    raise ToolError(f"{path}.{name} is not an allowed argument")
+        checks.append(check_object)
+
+    if "items" in schema:
+        validate_item = compile_schema(schema["items"], f"{path}[]")
+
+        def check_items(value):
+            if isinstance(value, list):
+                for item in value:
+                    validate_item(item)
+        checks.append(check_items)
+
+    def validate(value):
+        for check in checks:
+            check(value)
+
+    return validate
+
+class Tool:
+    """A callable exposed to the assistant, with its schema and timeout."""
+
+    def __init__(self, func, description="", parameters=None, timeout=None):
+        self.func = func
+        self.name = func.__name__
+        self.description = description
+        self.parameters = parameters if parameters is not None else {"type": "object", "properties": {}, "required": []}
+        self.timeout = timeout
+        self.validate = compile_schema(self.parameters)
+
+    def parse_arguments(self, arguments):
+        """
+        Parses and validates the JSON arguments of a tool call.
+
+        Args:
+            arguments (str): The arguments as sent by the model.
+
+        Returns:
+            dict: The keyword arguments for the tool function.
+        """
+
+        try:
+            kwargs = json.loads(arguments) if arguments else {}
+        except ValueError as e:
+            raise ToolError(f"invalid JSON arguments for {self.name}: {e}")
+        self.validate(kwargs)
+        return kwargs
+
+    def schema(self):
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+            }
+        }
+
+class ToolRegistry:
+    """Maps tool names to their functions for constant-time dispatch."""
+
+    def __init__(self):
+        self._tools = {}
+
+    def register(self, func, description="", parameters=None, timeout=None):
+        """
+        Registers a function as a tool.
+
+        Args:
+            func (callable): The tool function. Its __name__ is the tool name.
+            description (str, optional): The description shown to the model.
+            parameters (dict, optional): The JSON schema of the keyword arguments. Defaults to no arguments.
+            timeout (float, optional): Seconds the tool may run before it is reported as timed out.
+
+        Returns:
+            callable: The function, unchanged.
+        """
+
+        tool = Tool(func, description, parameters, timeout)
+        self._tools[tool.name] = tool
+        return func
+
+    @classmethod
+    def from_functions(cls, funcs):
+        """Builds a registry from plain functions, without argument schemas."""
+        registry = cls()
+        for func in funcs or []:
+            registry._tools[func.__name__] = Tool(func, parameters={"type": "object", "additionalProperties": True})
+        return registry
+
+    def get(self, name):
+        return self._tools.get(name)
+
+    def schemas(self):
+        """Returns the tool definitions to pass to create_assistant."""
+        return [tool.schema() for tool in self._tools.values()]
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def __iter__(self):
+        return iter(self._tools.values())
+
+    def __len__(self):
+        return len(self._tools)
+
+# Accept either a registry or a plain list of functions
+def as_registry(funcs):
+    if isinstance(funcs, ToolRegistry):
+        return funcs
+    return ToolRegistry.from_functions(funcs)
+
+# Registering the functions
+tool_registry = ToolRegistry()
+
+tool_registry.register(
+    get_current_location,
+    description="Get the current geographical location of the user based on IP address.",
+    timeout=5,
+)
+
+tool_registry.register(
+    get_weather,
+    description="Get the current weather for the specified location, or for the user's location if none is given. The assistant will give advice based on the weather and it will also advice the users weather is suitable to go out or not.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "city": {
+                "type": "string",
+                "description": "The city to get the weather for. Leave out for the user's current location."
+            },
+            "latitude": {
+                "type": "number",
+                "description": "The latitude, used with longitude instead of a city."
+            },
+            "longitude": {
+                "type": "number",
+                "description": "The longitude, used with latitude instead of a city."
+            }
+        },
+        "required": []
+    },
+    timeout=10,
+)
+
+tool_registry.register(
+    get_weather_batch,
+    description="Get the current weather for several cities at once, e.g. to compare destinations. Use this instead of calling get_weather once per city.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "cities": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "The cities to get the weather for."
+            }
+        },
+        "required": ["cities"]
+    },
+    timeout=10,
+)
+
+tool_registry.register(
+    get_news_updates,
+    description="Get the latest news updates on a given topic in a short summary. The assistant will reply in a short sentence",
+    parameters={
+        "type": "object",
+        "properties": {
+            "topic": {
+                "type": "string",
+                "description": "The topic for which to get the news updates."
+            }
+        },
+        "required": ["topic"]
+    },
+    timeout=10,
+)
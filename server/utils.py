@@ -2,8 +2,11 @@ import os
 import datetime
 import json
 import random
-import requests
+import http_client
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from cache import ttl_cache
+from news_feed import fetch_articles, format_articles
 
 # Load environment variables
 load_dotenv()
@@ -11,14 +14,34 @@ load_dotenv()
 # Load NinjasAPI key
 NINJAS_API_KEY = os.getenv("NINJAS_API_KEY")
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
-NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
 random.seed(2024)
 
+# Tool result cache settings (seconds). Set TOOL_CACHE_DIR to keep the cache across restarts.
+TOOL_CACHE_DIR = os.getenv("TOOL_CACHE_DIR")
+LOCATION_CACHE_TTL = 60 * 60
+WEATHER_CACHE_TTL = 10 * 60
+NEWS_CACHE_TTL = 15 * 60
+
+# Articles the news tool summarizes
+NEWS_TOOL_ARTICLES = 5
+
+# Only cache real results, not the error strings the tools return on failure
+def is_successful_result(result):
+    return result is not None and not (isinstance(result, str) and result.startswith("Unable to retrieve"))
+
+# Hit/miss counters for every cached tool
+def get_cache_stats():
+    return {
+        func.__name__: func.cache_info()._asdict()
+        for func in (get_current_location, get_weather, get_news_updates)
+    }
+
 # Function to get the current location of the user
+@ttl_cache(LOCATION_CACHE_TTL, maxsize=1, persist_dir=TOOL_CACHE_DIR, cache_if=is_successful_result)
 def get_current_location():
     try:
-        response = requests.get("https://ipinfo.io")
+        response = http_client.get("https://ipinfo.io")
         if response.status_code == 200:
             data = response.json()
             return {
@@ -33,17 +56,42 @@ def get_current_location():
         print(f"Error getting location: {e}")
         return None
 
-# Function to get the weather based on the current location
-def get_weather():
-    location = get_current_location()
-    location = location['city']
-    print(f"Getting weather for {location}")
+# Weather for a city or coordinates; without either, for the user's location
+@ttl_cache(WEATHER_CACHE_TTL, maxsize=32, persist_dir=TOOL_CACHE_DIR, cache_if=is_successful_result)
+def get_weather(city=None, latitude=None, longitude=None):
+    """
+    Gets the current weather in one weatherapi.com request.
+
+    Without a city or coordinates, the cached location from
+    get_current_location is used. If no location is cached, weatherapi.com
+    resolves the caller's IP address itself ("auto:ip"), so there is no extra
+    ipinfo.io round trip before it.
+
+    Args:
+        city (str, optional): The city name. Defaults to None.
+        latitude (float, optional): The latitude, used together with longitude. Defaults to None.
+        longitude (float, optional): The longitude, used together with latitude. Defaults to None.
+
+    Returns:
+        dict: The temperature, feels-like temperature, humidity and city, or an error string.
+    """
+    if city:
+        query = city
+    elif latitude is not None and longitude is not None:
+        query = f"{latitude},{longitude}"
+    else:
+        location = get_current_location.cached()
+        query = location["city"] if location and location.get("city") else "auto:ip"
+    print(f"Getting weather for {query}")
     api_key = WEATHER_API_KEY
-    url = f"http://api.weatherapi.com/v1/current.json?key={api_key}&q={location}"
-    response = requests.get(url)
+    url = "http://api.weatherapi.com/v1/current.json"
+    try:
+        response = http_client.get(url, params={"key": api_key, "q": query})
+    except Exception as e:
+        print(f"Error getting weather: {e}")
+        return "Unable to retrieve weather data."
     if response.status_code == 200:
         data = response.json()
-        print(data)
         return {
             "temperature": data['current']['temp_c'],
             "feels_like": data['current']['feelslike_c'],
@@ -53,23 +101,39 @@ def get_weather():
     else:
         return "Unable to retrieve weather data."
 
+# Weather for several cities at once
+def get_weather_batch(cities):
+    """
+    Gets the current weather for several cities concurrently.
+
+    Each city goes through get_weather, so cached cities cost no request, and
+    the rest take about as long as the slowest single request.
+
+    Args:
+        cities (list): The city names.
+
+    Returns:
+        dict: The get_weather result for each city, keyed by city name.
+    """
+    cities = list(dict.fromkeys(cities))
+    if not cities:
+        return {}
+    # One worker per kept-alive connection, so no request waits for a socket
+    with ThreadPoolExecutor(max_workers=min(len(cities), http_client.POOL_MAXSIZE)) as executor:
+        results = executor.map(lambda city: get_weather(city=city), cities)
+        return dict(zip(cities, results))
+
 # News API
+@ttl_cache(NEWS_CACHE_TTL, maxsize=64, persist_dir=TOOL_CACHE_DIR, cache_if=is_successful_result)
 def get_news_updates(topic):
-    api_key = NEWS_API_KEY
-    url = f"https://newsapi.org/v2/everything?q={topic}&apiKey={api_key}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        articles = data['articles']
-        news_text = f"Latest news on {topic}:\n"
-        for article in articles[:5]:  # Limit to 5 articles
-            title = article['title']
-            description = article['description']
-            url = article['url']
-            news_text += f"{title}\n{description}\nRead more: {url}\n\n"
-        return news_text
-    else:
+    # Only download the articles that are summarized
+    articles = fetch_articles(topic, NEWS_TOOL_ARTICLES)
+    if articles is None:
         return "Unable to retrieve news updates."
+    news_text = f"Latest news on {topic}:\n"
+    for paragraph in format_articles(articles):
+        news_text += f"{paragraph}\n\n"
+    return news_text
 
 # Weather forecast
 
@@ -99,24 +163,28 @@ def get_news_updates(topic):
 #         print(f"Error getting weather: {e}")
 #         return None
 
-######  TESTING WEATHER AREA  ######
-
-location_data = get_current_location()
-if location_data:
-    print(f"Location: {location_data['city']}, {location_data['region']}, {location_data['country']}")
-    weather_data = get_weather()
-    if weather_data:
-        print(weather_data)
-        
-else:
-    print("Failed to get location data")
-
-######  TESTING NEWS AREA  ######
-# Test news function
-topic = "technology"
-news_data = get_news_updates(topic)
-if news_data:
-    print("News Test:")
-    print(news_data)
-else:
-    print("Failed to get news updates")
\ No newline at end of file
+# Manual check of the live APIs: python utils.py
+if __name__ == "__main__":
+    ######  TESTING WEATHER AREA  ######
+
+    location_data = get_current_location()
+    if location_data:
+        print(f"Location: {location_data['city']}, {location_data['region']}, {location_data['country']}")
+        weather_data = get_weather()
+        if weather_data:
+            print(weather_data)
+
+    else:
+        print("Failed to get location data")
+
+    print(get_weather_batch(["London", "Tokyo", "Kuala Lumpur"]))
+
+    ######  TESTING NEWS AREA  ######
+    # Test news function
+    topic = "technology"
+    news_data = get_news_updates(topic)
+    if news_data:
+        print("News Test:")
+        print(news_data)
+    else:
+        print("Failed to get news updates")